@@ -1,21 +1,29 @@
 from dotenv import load_dotenv
 load_dotenv()
-import requests
+import asyncio
 import re
-import os
-base_url = os.getenv("LINKEDIN_API","https://linkedin.miatibro.art/api/v1")
-def get_all_company_posts(company_name):
+from typing import Optional
+from helper.tracing import traced
+from api.linkedin_client import linkedin_client, LINKEDIN_API
+from api.entity_cache import profile_cache, posts_cache, entity_key, lookup_entity, lookup_outcome
+base_url = LINKEDIN_API
+
+COMPANY_NOT_FOUND = {"user_data": None, "linkedin_id": None}
+
+
+async def _fetch_company(company_name: str) -> tuple[dict, Optional[str]]:
+    """({"user_data", "linkedin_id"}, outcome) of a LinkedIn company; both None when not found."""
     api_base = base_url + "/linkedin/company/"
-    
+
     # Step 1: Get provider_id from user_name
     user_url = api_base + company_name
     print("Fetching user data:", user_url)
-    response = requests.get(user_url)
+    response = await linkedin_client.get(user_url, "company")
 
     if response.status_code != 200:
         print("Error fetching user data:", response.status_code, response.text)
-        return None, None
-    
+        return COMPANY_NOT_FOUND, lookup_outcome(response.status_code)
+
     company_data_raw = response.json()
     company = company_data_raw.get("company", {})
     linkedin_id = company.get("linkedin_id")
@@ -23,8 +31,8 @@ def get_all_company_posts(company_name):
     if not linkedin_id:
         print("No linkedin_id found for user:", company_name)
         print("Full JSON response:", company_data_raw)  # debug
-        return None, None
-    
+        return COMPANY_NOT_FOUND, lookup_outcome(response.status_code, has_entity=False)
+
     print("company:    ",company)
     print("linkedin_id:    ",linkedin_id)
 
@@ -44,25 +52,29 @@ def get_all_company_posts(company_name):
         # "provider_id": provider_id,
         # "public_identifier": user.get("public_identifier")
     }
-    
+    return {"user_data": user_data, "linkedin_id": linkedin_id}, lookup_outcome(response.status_code)
+
+
+async def _fetch_company_posts(linkedin_id: str) -> tuple[dict, Optional[str]]:
+    """({"posts"}, outcome) of a LinkedIn company; posts is None when they could not be fetched."""
     # Step 2: Fetch posts using provider_id
                 # https://linkedin.miatibro.art
     post_base = base_url + "/unipile/company/"
     posts_url = f"{post_base}{linkedin_id}/posts"
     print("Fetching posts from:", posts_url)
-    response = requests.get(posts_url)
+    response = await linkedin_client.get(posts_url, "company_posts")
 
     if response.status_code != 200:
         print("Error fetching posts:", response.status_code, response.text)
-        return user_data, None
-    
+        return {"posts": None}, lookup_outcome(response.status_code)
+
     posts_data = response.json()
     posts_list = posts_data.get("posts", {}).get("items", [])
-    
+
     if not posts_list:
         print("No posts found for provider:", linkedin_id)
-        return user_data, []
-    
+        return {"posts": []}, lookup_outcome(response.status_code)
+
     # Step 3: Take top N posts
     top_posts = []
     for post in posts_list[:20]:
@@ -71,10 +83,10 @@ def get_all_company_posts(company_name):
         title = match.group(0)
         share_url = post.get("share_url")
         author = post.get("author", {}).get("name", "")
-        
+
         attachments = post.get("attachments", [])
         attachment_urls = [a.get("url") for a in attachments if "url" in a]
-        
+
         top_posts.append({
             "title": title,
             "author": author,
@@ -82,18 +94,37 @@ def get_all_company_posts(company_name):
             "share_url": share_url,
             "attachments": attachment_urls
         })
-    return user_data, top_posts
+    return {"posts": top_posts}, lookup_outcome(response.status_code)
+
+
+@traced("linkedin.get_all_company_posts")
+async def get_all_company_posts(company_name, allow_stale: bool = False):
+    """
+    (company_data, top_posts) of a LinkedIn company; (None, None) when the company is not
+    found, (company_data, None) when the posts could not be fetched. Profiles and posts
+    are cached separately (api/entity_cache.py); with `allow_stale`, expired entries are
+    served and refreshed in the background.
+    """
+    company = await lookup_entity(
+        profile_cache, entity_key("linkedin_company", company_name), lambda: _fetch_company(company_name), allow_stale
+    )
+    if company["linkedin_id"] is None:
+        return None, None
+    linkedin_id = str(company["linkedin_id"])
+    posts = await lookup_entity(
+        posts_cache, entity_key("linkedin_company_posts", linkedin_id), lambda: _fetch_company_posts(linkedin_id), allow_stale
+    )
+    return company["user_data"], posts["posts"]
 
 
 # Example usage
 if __name__ == "__main__":
-    user_data, top_posts = get_all_company_posts("OrbitAim")
-    
+    user_data, top_posts = asyncio.run(get_all_company_posts("OrbitAim"))
+
     print("\n=== User Data ===")
     print(user_data)
-    
+
     print("\n=== Top Posts ===")
     for i, post in enumerate(top_posts, start=1):
         print(f"\nPost {i}:")
         print(post)
-
@@ -0,0 +1,171 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import contextvars
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
+from helper.tiered_cache import TieredCache
+from helper.single_flight import normalize_query
+
+
+# Profiles (person details, LinkedIn user / company data) change rarely, posts daily;
+# lookups that found nothing are only remembered briefly
+ENTITY_PROFILE_TTL = float(os.getenv("ENTITY_PROFILE_TTL", str(7 * 24 * 3600)))
+ENTITY_POSTS_TTL = float(os.getenv("ENTITY_POSTS_TTL", str(24 * 3600)))
+ENTITY_NEGATIVE_TTL = float(os.getenv("ENTITY_NEGATIVE_TTL", str(3600)))
+# How long past their TTL found entries may still be served (stale-while-revalidate) while a
+# background refresh runs, and how many such refreshes may run at once process-wide
+ENTITY_STALE_TTL = float(os.getenv("ENTITY_STALE_TTL", str(7 * 24 * 3600)))
+ENTITY_REFRESH_CONCURRENCY = max(1, int(os.getenv("ENTITY_REFRESH_CONCURRENCY", "4")))
+ENTITY_CACHE_MAX_BYTES = int(os.getenv("ENTITY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+ENTITY_CACHE_DISK_MAX_BYTES = int(os.getenv("ENTITY_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+ENTITY_CACHE_DB_PATH = os.getenv("ENTITY_CACHE_DB_PATH", "entity_cache.db")
+
+
+profile_cache = TieredCache(
+    name="entity_profiles",
+    ttl=ENTITY_PROFILE_TTL,
+    max_bytes=ENTITY_CACHE_MAX_BYTES,
+    db_path=ENTITY_CACHE_DB_PATH,
+    disk_max_bytes=ENTITY_CACHE_DISK_MAX_BYTES,
+    stale_ttl=ENTITY_STALE_TTL,
+)
+posts_cache = TieredCache(
+    name="entity_posts",
+    ttl=ENTITY_POSTS_TTL,
+    max_bytes=ENTITY_CACHE_MAX_BYTES,
+    db_path=ENTITY_CACHE_DB_PATH,
+    disk_max_bytes=ENTITY_CACHE_DISK_MAX_BYTES,
+    stale_ttl=ENTITY_STALE_TTL,
+)
+
+# Outcomes of a fetch: cache for the cache's TTL, cache briefly, or (None) do not cache
+FOUND = "found"
+NOT_FOUND = "not_found"
+
+# Fetch of an entity: (value, outcome)
+EntityFetch = Callable[[], Awaitable[tuple[Any, Optional[str]]]]
+
+
+def lookup_outcome(status_code, has_entity: bool = True) -> Optional[str]:
+    """
+    How an upstream answer is cached. NOT_FOUND when the upstream says the entity does
+    not exist: a 404, or a 2xx without the entity's id ("No provider_id found", no
+    profile_link). FOUND for a 2xx carrying it. None (not cached) for anything else.
+    """
+    if status_code == 404:
+        return NOT_FOUND
+    if not isinstance(status_code, int) or not 200 <= status_code < 300:
+        return None
+    return FOUND if has_entity else NOT_FOUND
+
+
+def entity_key(kind: str, *parts: str) -> str:
+    """e.g. entity_key("person", name, basic_details) -> "person:satya nadella|company=microsoft"."""
+    return f"{kind}:" + "|".join(normalize_query(part) for part in parts)
+
+
+async def get_entity(cache: TieredCache, key: str, allow_stale: bool = False) -> Optional[tuple[Any, bool]]:
+    """
+    (cached lookup result, fresh) — found or not found — or None when it has to be fetched.
+    Found results past their TTL are only returned with `allow_stale`; expired not-found
+    results are never served stale, so a profile that appears is picked up at once.
+    """
+    if allow_stale:
+        found = await cache.get_stale(key)
+        if found is None:
+            return None
+        entry, fresh = found
+    else:
+        entry, fresh = await cache.get(key), True
+        if entry is None:
+            return None
+    if entry["expires_at"] is not None and entry["expires_at"] < time.time():
+        return None
+    return entry["value"], fresh
+
+
+async def store_entity(cache: TieredCache, key: str, value: Any, not_found: bool = False) -> None:
+    """
+    Caches a lookup result for the cache's TTL; with `not_found` (the upstream answered
+    that the entity does not exist) only for ENTITY_NEGATIVE_TTL.
+    Transient failures (timeouts, 5xx) should not be stored at all.
+    """
+    expires_at = time.time() + ENTITY_NEGATIVE_TTL if not_found else None
+    await cache.set(key, {"value": value, "expires_at": expires_at})
+
+
+async def _fetch_and_store(cache: TieredCache, key: str, fetch: EntityFetch) -> Any:
+    value, outcome = await fetch()
+    if outcome == FOUND:
+        await store_entity(cache, key, value)
+    elif outcome == NOT_FOUND:
+        await store_entity(cache, key, value, not_found=True)
+    return value
+
+
+class EntityRefresher:
+    """
+    Background refreshes of stale entity cache entries: at most `concurrency` at a time
+    process-wide, one per key. A refresh that fails leaves the stale entry in place.
+    """
+
+    def __init__(self, concurrency: int = ENTITY_REFRESH_CONCURRENCY):
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.refreshed = 0
+        self.failed = 0
+
+    def schedule(self, cache: TieredCache, key: str, fetch: EntityFetch) -> None:
+        if key in self._in_flight:
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        # a fresh context: the refresh must not inherit the request's deadline, trace or priority
+        task = asyncio.create_task(self._refresh(cache, key, fetch), context=contextvars.Context())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._in_flight.pop(key, None))
+
+    async def _refresh(self, cache: TieredCache, key: str, fetch: EntityFetch) -> None:
+        async with self._semaphore:
+            try:
+                value, outcome = await fetch()
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️ Refresh of '{key}' failed, keeping the stale entry: {e}")
+                return
+            if outcome == FOUND:
+                await store_entity(cache, key, value)
+                self.refreshed += 1
+            elif outcome == NOT_FOUND:
+                await store_entity(cache, key, value, not_found=True)
+                self.refreshed += 1
+            else:
+                self.failed += 1
+                print(f"⚠️ Refresh of '{key}' failed, keeping the stale entry")
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._in_flight), "refreshed": self.refreshed, "failed": self.failed}
+
+
+entity_refresher = EntityRefresher()
+
+
+async def lookup_entity(cache: TieredCache, key: str, fetch: EntityFetch, allow_stale: bool = False) -> Any:
+    """
+    Cached value of `key`, fetched (and cached by outcome) on a miss. With `allow_stale`,
+    an entry past its TTL is returned at once and refreshed in the background.
+    """
+    cached = await get_entity(cache, key, allow_stale)
+    if cached is not None:
+        value, fresh = cached
+        if not fresh:
+            entity_refresher.schedule(cache, key, fetch)
+        return value
+    return await _fetch_and_store(cache, key, fetch)
+
+
+def entity_cache_stats() -> dict:
+    return {"profiles": profile_cache.stats(), "posts": posts_cache.stats(), "refresh": entity_refresher.stats()}
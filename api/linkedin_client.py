@@ -0,0 +1,84 @@
+from dotenv import load_dotenv
+load_dotenv()
+import aiohttp
+import asyncio
+import json
+import os
+import time
+from helper.run_budget import outbound_timeout
+from helper.http_sessions import http_sessions
+from helper.tracing import span
+from helper.metrics import LINKEDIN_RESPONSES, LINKEDIN_DURATION
+
+
+LINKEDIN_API = os.getenv("LINKEDIN_API", "https://linkedin.miatibro.art/api/v1")
+
+# Seconds to open a connection, to wait for each chunk of the answer, and for the whole request
+LINKEDIN_CONNECT_TIMEOUT = float(os.getenv("LINKEDIN_CONNECT_TIMEOUT", "5"))
+LINKEDIN_READ_TIMEOUT = float(os.getenv("LINKEDIN_READ_TIMEOUT", "30"))
+LINKEDIN_TOTAL_TIMEOUT = float(os.getenv("LINKEDIN_TOTAL_TIMEOUT", "60"))
+# Connection limits of the pooled session for the LinkedIn API host (all endpoints, all concurrent requests)
+LINKEDIN_MAX_CONNECTIONS = max(1, int(os.getenv("LINKEDIN_MAX_CONNECTIONS", "20")))
+LINKEDIN_KEEPALIVE_TIMEOUT = float(os.getenv("LINKEDIN_KEEPALIVE_TIMEOUT", "30"))
+
+
+class LinkedInResponse:
+    """Status code and body of a LinkedIn API answer, read in full."""
+    __slots__ = ("status_code", "body")
+
+    def __init__(self, status_code: int, body: bytes):
+        self.status_code = status_code
+        self.body = body
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class LinkedInClient:
+    """
+    GETs against the LinkedIn API over the pooled session of its host
+    (helper/http_sessions.py), so a request holds a socket instead of an executor thread,
+    and a backend that hangs costs one bounded timeout.
+    """
+
+    def __init__(
+        self,
+        base_url: str = LINKEDIN_API,
+        max_connections: int = LINKEDIN_MAX_CONNECTIONS,
+        keepalive_timeout: float = LINKEDIN_KEEPALIVE_TIMEOUT,
+    ):
+        self.base_url = base_url
+        http_sessions.configure(base_url, max_connections=max_connections, keepalive_timeout=keepalive_timeout)
+
+    async def get(self, url: str, endpoint: str) -> LinkedInResponse:
+        """
+        GET `url`, read in full. Raises asyncio.TimeoutError / aiohttp.ClientError when
+        the backend cannot be reached or stops answering.
+        """
+        timeout = aiohttp.ClientTimeout(
+            total=outbound_timeout(LINKEDIN_TOTAL_TIMEOUT),
+            connect=LINKEDIN_CONNECT_TIMEOUT,
+            sock_read=LINKEDIN_READ_TIMEOUT,
+        )
+        started = time.perf_counter()
+        status_code = "error"
+        try:
+            with span("linkedin.get", client=True, url=url, endpoint=endpoint) as request_span:
+                async with http_sessions.session(url).get(url, timeout=timeout) as response:
+                    body = await response.read()
+                status_code = response.status
+                request_span.set_attributes(status_code=response.status, payload_bytes=len(body))
+                return LinkedInResponse(response.status, body)
+        except asyncio.TimeoutError:
+            status_code = "timeout"
+            raise
+        finally:
+            LINKEDIN_DURATION.observe(time.perf_counter() - started, endpoint=endpoint)
+            LINKEDIN_RESPONSES.inc(endpoint=endpoint, status_code=status_code)
+
+
+linkedin_client = LinkedInClient()
@@ -0,0 +1,121 @@
+import asyncio
+import re
+import unicodedata
+from typing import Awaitable, Optional
+from api.person_details import fetch_person_details
+from helper.extractor import extract_linkedin_username
+from helper.metrics import LINKEDIN_RESOLUTIONS
+from helper.tracing import span
+
+
+_PROFILE_URL = re.compile(r"linkedin\.com/in/([A-Za-z0-9\-_%]+)", re.IGNORECASE)
+_WORD = re.compile(r"[a-z0-9]+")
+
+# person-details lookups that lost the race, still running to fill the entity cache
+# (the event loop only keeps weak references to tasks)
+_background_lookups: set[asyncio.Task] = set()
+
+
+def _words(text: str) -> list[str]:
+    """Lower-cased ASCII words of `text` (accents folded)."""
+    folded = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return _WORD.findall(folded.lower())
+
+
+def _attribute_words(attributes: dict) -> list[set[str]]:
+    """Word sets of the attribute values worth matching (ignores one-letter noise)."""
+    values = []
+    for value in attributes.values():
+        words = {word for word in _words(str(value)) if len(word) > 1}
+        if words:
+            values.append(words)
+    return values
+
+
+def linkedin_username_from_results(results: list[dict], name: str, attributes: dict) -> Optional[str]:
+    """
+    The LinkedIn username of `name` from web results, or None unless exactly one
+    linkedin.com/in profile is a confident match: every name word in the result's title
+    or profile slug, and — when attributes are given — every word of at least one
+    attribute value in its title or content.
+    """
+    name_words = set(_words(name))
+    if not name_words:
+        return None
+    attribute_words = _attribute_words(attributes)
+
+    usernames = set()
+    for result in results:
+        match = _PROFILE_URL.search(result.get("url") or "")
+        if match is None:
+            continue
+        username = match.group(1)
+        slug = "".join(_words(username))
+        title_words = set(_words(result.get("title") or ""))
+        if not all(word in title_words or word in slug for word in name_words):
+            continue
+        if attribute_words:
+            text_words = title_words | set(_words(result.get("content") or ""))
+            if not any(words <= text_words for words in attribute_words):
+                continue
+        usernames.add(username.lower())
+
+    # two different profiles look right: let person details decide
+    return usernames.pop() if len(usernames) == 1 else None
+
+
+def _username_from_details(details) -> Optional[str]:
+    if isinstance(details, BaseException) or not details.get("success"):
+        return None
+    profile_link = (details.get("data") or {}).get("profile_link", "")
+    return extract_linkedin_username(profile_link) or None
+
+
+async def resolve_linkedin_username(
+    name: str,
+    basic_details: str,
+    attributes: dict,
+    web_results: Optional[Awaitable[list[dict]]] = None,
+) -> str:
+    """
+    Races the person-details service against the LinkedIn profile URLs among
+    `web_results` (the person's name-filtered web results, still being searched) and
+    returns the first confident username, or "" when neither source produces one.
+
+    The losing person-details call is left running, so its answer still lands in the
+    entity cache for the next run.
+    """
+    details_task = asyncio.ensure_future(fetch_person_details(
+        user_name=name,
+        basic_details=basic_details,
+        allow_stale=True,
+    ))
+    pending = {details_task}
+    if web_results is not None:
+        pending.add(asyncio.ensure_future(web_results))
+
+    with span("linkedin.resolve_username", user_name=name) as resolve_span:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task is details_task:
+                    source = "person_details"
+                    username = _username_from_details(task.exception() or task.result())
+                else:
+                    source = "web_results"
+                    username = None if task.exception() else linkedin_username_from_results(task.result(), name, attributes)
+                if username:
+                    print(f"🔗 LinkedIn username for '{name}' from {source}: {username}")
+                    resolve_span.set_attributes(source=source)
+                    LINKEDIN_RESOLUTIONS.inc(source=source)
+                    if not details_task.done():
+                        _background_lookups.add(details_task)
+                        details_task.add_done_callback(_background_lookups.discard)
+                    return username
+
+        print(f"⚠️ No LinkedIn username resolved for '{name}'")
+        resolve_span.set_attributes(source="none")
+        LINKEDIN_RESOLUTIONS.inc(source="none")
+        return ""
@@ -1,30 +1,66 @@
 import aiohttp
 import asyncio
 from typing import Optional
+from helper.run_budget import outbound_timeout
+from helper.tracing import span
+from helper.http_sessions import http_sessions
+from helper.metrics import LINKEDIN_RESPONSES, LINKEDIN_DURATION
+from api.entity_cache import profile_cache, entity_key, lookup_entity, lookup_outcome
+import time
+
+
+PERSON_DETAILS_URL = "https://onboardsapi.miatibro.art/person_details"
+http_sessions.configure(PERSON_DETAILS_URL)
 
 
 async def fetch_person_details(
     user_name: str,
     basic_details: str,
-    timeout: int = 120
+    timeout: int = 120,
+    allow_stale: bool = False,
 ) -> dict:
-    url = "https://onboardsapi.miatibro.art/person_details"
+    """
+    Person details keyed by normalized name + basic_details in the entity cache
+    (api/entity_cache.py): found profiles are kept for ENTITY_PROFILE_TTL, 404s and
+    answers without a profile_link for ENTITY_NEGATIVE_TTL, transient failures not at all.
+    With `allow_stale`, an expired profile is returned at once and refreshed in the background.
+    """
+    async def fetch() -> tuple[dict, Optional[str]]:
+        result = await _fetch_person_details(user_name, basic_details, timeout)
+        data = result.get("data")
+        has_profile = isinstance(data, dict) and bool(data.get("profile_link"))
+        return result, lookup_outcome(result.get("status_code"), has_entity=has_profile)
+
+    return await lookup_entity(profile_cache, entity_key("person", user_name, basic_details), fetch, allow_stale)
+
+
+async def _fetch_person_details(user_name: str, basic_details: str, timeout: int) -> dict:
+    url = PERSON_DETAILS_URL
     payload = {
         "user_name": user_name,
         "basic_details": basic_details
     }
 
+    # never wait past the current run's deadline
+    timeout = outbound_timeout(timeout)
+
+    started = time.perf_counter()
+    status_code = "error"
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
+        with span("linkedin.fetch_person_details", client=True, user_name=user_name, timeout_s=timeout) as request_span:
+            async with http_sessions.session(url).post(
                 url,
                 json=payload,
                 headers={"Content-Type": "application/json"},
                 timeout=aiohttp.ClientTimeout(total=timeout)
             ) as response:
+                status_code = response.status
+                request_span.set_attributes(status_code=response.status)
                 response.raise_for_status()
+                body = await response.read()
+                request_span.set_attributes(payload_bytes=len(body))
                 data = await response.json()
-                return {"success": True, "data": data}
+                return {"success": True, "data": data, "status_code": response.status}
 
     except aiohttp.ClientResponseError as e:
         return {"success": False, "error": f"HTTP {e.status}: {e.message}", "status_code": e.status}
@@ -33,6 +69,7 @@ async def fetch_person_details(
         return {"success": False, "error": f"Connection failed: {str(e)}"}
 
     except asyncio.TimeoutError:
+        status_code = "timeout"
         return {"success": False, "error": f"Request timed out after {timeout}s"}
 
     except aiohttp.ContentTypeError as e:
@@ -41,6 +78,10 @@ async def fetch_person_details(
     except Exception as e:
         return {"success": False, "error": f"Unexpected error: {str(e)}"}
 
+    finally:
+        LINKEDIN_DURATION.observe(time.perf_counter() - started, endpoint="person_details")
+        LINKEDIN_RESPONSES.inc(endpoint="person_details", status_code=status_code)
+
 
 # Usage
 async def main():
@@ -1,21 +1,29 @@
 from dotenv import load_dotenv
 load_dotenv()
-import requests
+import asyncio
 import re
-import os
-base_url = os.getenv("LINKEDIN_API","https://linkedin.miatibro.art/api/v1")
-def get_all_posts(user_name):
+from typing import Optional
+from helper.tracing import traced
+from api.linkedin_client import linkedin_client, LINKEDIN_API
+from api.entity_cache import profile_cache, posts_cache, entity_key, lookup_entity, lookup_outcome
+base_url = LINKEDIN_API
+
+USER_NOT_FOUND = {"user_data": None, "provider_id": None}
+
+
+async def _fetch_user(user_name: str) -> tuple[dict, Optional[str]]:
+    """({"user_data", "provider_id"}, outcome) of a LinkedIn user; both None when not found."""
     api_base = base_url + "/unipile/user/"
-    
+
     # Step 1: Get provider_id from user_name
     user_url = api_base + user_name
     print("Fetching user data:", user_url)
-    response = requests.get(user_url)
+    response = await linkedin_client.get(user_url, "user")
 
     if response.status_code != 200:
         print("Error fetching user data:", response.status_code, response.text)
-        return None, None
-    
+        return USER_NOT_FOUND, lookup_outcome(response.status_code)
+
     user_data_raw = response.json()
     user = user_data_raw.get("user", {})
     provider_id = user.get("provider_id")
@@ -23,8 +31,8 @@ def get_all_posts(user_name):
     if not provider_id:
         print("No provider_id found for user:", user_name)
         print("Full JSON response:", user_data_raw)  # debug
-        return None, None
-    
+        return USER_NOT_FOUND, lookup_outcome(response.status_code, has_entity=False)
+
     print("user:    ",user)
     print("provider_id:    ",provider_id)
 
@@ -42,25 +50,29 @@ def get_all_posts(user_name):
         # "provider_id": provider_id,
         # "public_identifier": user.get("public_identifier")
     }
-    
+    return {"user_data": user_data, "provider_id": provider_id}, lookup_outcome(response.status_code)
+
+
+async def _fetch_posts(provider_id: str) -> tuple[dict, Optional[str]]:
+    """({"posts"}, outcome) of a LinkedIn user; posts is None when they could not be fetched."""
     # Step 2: Fetch posts using provider_id
                 # https://linkedin.miatibro.art
     post_base = base_url + "/users/"
     posts_url = f"{post_base}{provider_id}/posts"
     print("Fetching posts from:", posts_url)
-    response = requests.get(posts_url)
+    response = await linkedin_client.get(posts_url, "posts")
 
     if response.status_code != 200:
         print("Error fetching posts:", response.status_code, response.text)
-        return user_data, None
-    
+        return {"posts": None}, lookup_outcome(response.status_code)
+
     posts_data = response.json()
     posts_list = posts_data.get("posts", {}).get("items", [])
-    
+
     if not posts_list:
         print("No posts found for provider:", provider_id)
-        return user_data, []
-    
+        return {"posts": []}, lookup_outcome(response.status_code)
+
     # Step 3: Take top N posts
     top_posts = []
     for post in posts_list:
@@ -69,10 +81,10 @@ def get_all_posts(user_name):
         title = match.group(0)
         share_url = post.get("share_url")
         author = post.get("author", {}).get("name", "")
-        
+
         attachments = post.get("attachments", [])
         attachment_urls = [a.get("url") for a in attachments if "url" in a]
-        
+
         top_posts.append({
             "title": title,
             "author": author,
@@ -80,18 +92,37 @@ def get_all_posts(user_name):
             "share_url": share_url,
             "attachments": attachment_urls
         })
-    return user_data, top_posts
+    return {"posts": top_posts}, lookup_outcome(response.status_code)
+
+
+@traced("linkedin.get_all_posts")
+async def get_all_posts(user_name, allow_stale: bool = False):
+    """
+    (user_data, top_posts) of a LinkedIn user; (None, None) when the user is not found,
+    (user_data, None) when the posts could not be fetched. Profiles and posts are cached
+    separately (api/entity_cache.py); with `allow_stale`, expired entries are served
+    and refreshed in the background.
+    """
+    user = await lookup_entity(
+        profile_cache, entity_key("linkedin_user", user_name), lambda: _fetch_user(user_name), allow_stale
+    )
+    if user["provider_id"] is None:
+        return None, None
+    provider_id = user["provider_id"]
+    posts = await lookup_entity(
+        posts_cache, entity_key("linkedin_posts", provider_id), lambda: _fetch_posts(provider_id), allow_stale
+    )
+    return user["user_data"], posts["posts"]
 
 
 # Example usage
 if __name__ == "__main__":
-    user_data, top_posts = get_all_posts("sa2003hil")
-    
+    user_data, top_posts = asyncio.run(get_all_posts("sa2003hil"))
+
     print("\n=== User Data ===")
     print(user_data)
-    
+
     print("\n=== Top Posts ===")
     for i, post in enumerate(top_posts, start=1):
         print(f"\nPost {i}:")
         print(post)
-
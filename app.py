@@ -3,7 +3,7 @@
 from boss_env import load_aws_secrets
 load_aws_secrets()
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import json
@@ -11,19 +11,36 @@ import os
 import uuid
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware 
+from fastapi.responses import StreamingResponse
 from datetime import datetime
 from contextlib import asynccontextmanager
 
 
 
-from main import main_function
+from main import main_function, research_events, coalesced_main_function, research_single_flight
+from processes.checkpoint import checkpoint_store
+from processes.result_cache import result_cache
+from jobs.job_store import job_store, JOB_COMPLETED, JOB_FAILED
+from jobs.job_worker import job_worker_pool
+from tools.tavily import tavily_client_registry
+from processes.research_graph import ADAPTIVE_MAX_ROUNDS_LIMIT
+from helper.http_sessions import http_sessions
+from api.entity_cache import entity_cache_stats
+from tools.tavily_keys import tavily_key_scheduler
+from tools.tavily_scheduler import tavily_search_scheduler
+from tools.search_cache import search_cache
+from tools.semantic_search_cache import semantic_query_index
+from helper.tracing import get_trace
+from helper.metrics import render_metrics
 # ----------------------------
 # FastAPI App
 # ----------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        pass
+        await http_sessions.start()
+        tavily_client_registry.start()
+        await job_worker_pool.start()
 
     except Exception as e:
         raise
@@ -34,6 +51,9 @@ async def lifespan(app: FastAPI):
 
 
     try:
+        await job_worker_pool.stop()
+        tavily_client_registry.close()
+        await http_sessions.close()
         print("Completed")
     except Exception as e:
         raise
@@ -62,7 +82,19 @@ app.add_middleware(
 import traceback
 from typing import Literal
 
-VALID_RESEARCH_TYPES = {"Shallow", "Intermediate", "Deep"}
+VALID_RESEARCH_TYPES = {"Shallow", "Intermediate", "Deep", "Adaptive"}
+
+# Optional per-request tuning: name -> (type, minimum, maximum or None)
+RESEARCH_OPTIONS = {
+    # Adaptive runs
+    "max_rounds": (int, 1, ADAPTIVE_MAX_ROUNDS_LIMIT),
+    "time_budget_s": (float, 1, None),
+    "max_searches": (int, 0, None),
+    # any run: latency deadline and spend budget
+    "deadline_s": (float, 1, None),
+    "max_llm_tokens": (int, 1, None),
+    "max_tavily_credits": (int, 0, None),
+}
 
 @app.get("/")
 async def home():
@@ -80,23 +112,180 @@ async def home():
 
 
 
+def _parse_research_options(data: dict) -> dict:
+    options = {}
+    for name, (cast, minimum, maximum) in RESEARCH_OPTIONS.items():
+        if data.get(name) is None:
+            continue
+        try:
+            value = cast(data[name])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid {name} '{data[name]}'")
+        if value < minimum:
+            raise HTTPException(status_code=400, detail=f"{name} must be >= {minimum}")
+        if maximum is not None and value > maximum:
+            raise HTTPException(status_code=400, detail=f"{name} must be <= {maximum}")
+        options[name] = value
+    return options
+
+
+async def _parse_research_request(request: Request) -> tuple[str, str, dict]:
+    data = await request.json()
+
+    research_type = data.get("research_type", "Shallow")
+    if research_type not in VALID_RESEARCH_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid research_type '{research_type}'. Must be one of: {sorted(VALID_RESEARCH_TYPES)}"
+        )
+
+    query = data.get("query", None)
+    if not query:
+        raise HTTPException(status_code=400, detail="No User Query")
+
+    return research_type, query, _parse_research_options(data)
+
+
+def _sse_message(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "coalescing": research_single_flight.stats(),
+        "result_cache": result_cache.stats(),
+        "search_cache": search_cache.stats(),
+        "semantic_search_cache": semantic_query_index.stats(),
+        "http_sessions": http_sessions.stats(),
+        "entity_cache": entity_cache_stats(),
+        "tavily_keys": tavily_key_scheduler.stats(),
+        "tavily_search_queue": tavily_search_scheduler.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of pipeline, upstream (Tavily, LinkedIn, Bedrock) and MPNet metrics."""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.post("/deep-research")
-async def deep_research(request: Request):
+async def deep_research(request: Request, response: Response):
     try:
-        data = await request.json()
+        research_type, query, options = await _parse_research_request(request)
+
+        run_id, trace_id, notes = await coalesced_main_function(
+            research_type=research_type, query=query, run_id=uuid.uuid4().hex, options=options
+        )
+        response.headers["X-Run-Id"] = run_id
+        response.headers["X-Trace-Id"] = trace_id
+        # per-request latency breakdown on demand: X-Debug-Trace: 1
+        if request.headers.get("X-Debug-Trace") and get_trace(trace_id):
+            response.headers["Server-Timing"] = get_trace(trace_id).server_timing()
+        return notes
 
-        research_type = data.get("research_type", "Shallow")
+    except HTTPException:
+        raise
+    except Exception as e:
+        tb = traceback.format_exc()
+        print(tb)
+        raise HTTPException(status_code=500, detail=f"{str(e)}\n\n{tb}")
+
+@app.post("/runs/{run_id}/resume")
+async def resume_run(run_id: str, request: Request, response: Response):
+    """Restarts a failed or interrupted run at its first incomplete stage, or upgrades it to a deeper research_type."""
+    try:
+        state = await checkpoint_store.load(run_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail=f"Run '{run_id}' not found")
+
+        data = await request.json() if await request.body() else {}
+        research_type = data.get("research_type") or state.get("research_type", "Shallow")
         if research_type not in VALID_RESEARCH_TYPES:
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid research_type '{research_type}'. Must be one of: {sorted(VALID_RESEARCH_TYPES)}"
             )
 
-        query = data.get("query", None)
-        if not query:
-            raise HTTPException(status_code=400, detail="No User Query")
+        options = _parse_research_options(data) or None
+        response.headers["X-Run-Id"] = run_id
+        return await main_function(research_type=research_type, run_id=run_id, options=options)
 
-        return await main_function(research_type=research_type, query=query)
+    except HTTPException:
+        raise
+    except Exception as e:
+        tb = traceback.format_exc()
+        print(tb)
+        raise HTTPException(status_code=500, detail=f"{str(e)}\n\n{tb}")
+
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    state = await checkpoint_store.load(run_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Run '{run_id}' not found")
+
+    return {
+        "run_id": run_id,
+        "research_type": state.get("research_type"),
+        "status": state["status"],
+        "error": state["error"],
+        "completed_stages": state["completed_stages"],
+        "skipped_stages": state.get("skipped_stages", []),
+        "timings": state.get("timings", {}),
+        "spend": state.get("spend"),
+        "trace_id": state.get("trace_id"),
+    }
+
+
+@app.get("/runs/{run_id}/trace")
+async def get_run_trace(run_id: str):
+    """OTLP/JSON trace of the latest invocation of a run, while it is still held in memory."""
+    state = await checkpoint_store.load(run_id)
+    trace = get_trace(state.get("trace_id")) if state and state.get("trace_id") else None
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"No trace held for run '{run_id}'")
+    return trace.to_otlp()
+
+
+@app.post("/deep-research/stream")
+async def deep_research_stream(request: Request):
+    try:
+        research_type, query, options = await _parse_research_request(request)
+
+        async def event_stream():
+            try:
+                async for stage in research_events(research_type=research_type, query=query, options=options):
+                    yield _sse_message(stage["event"], stage["data"])
+            except Exception as e:
+                tb = traceback.format_exc()
+                print(tb)
+                yield _sse_message("error", {"detail": str(e)})
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        tb = traceback.format_exc()
+        print(tb)
+        raise HTTPException(status_code=500, detail=f"{str(e)}\n\n{tb}")
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: Request):
+    try:
+        research_type, query, options = await _parse_research_request(request)
+
+        if not job_worker_pool.accepting:
+            raise HTTPException(status_code=503, detail="Job workers are shutting down")
+
+        job_id = await job_worker_pool.submit(research_type=research_type, query=query, options=options)
+        return {"job_id": job_id, "status": "queued"}
 
     except HTTPException:
         raise
@@ -105,6 +294,37 @@ async def deep_research(request: Request):
         print(tb)
         raise HTTPException(status_code=500, detail=f"{str(e)}\n\n{tb}")
 
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = await job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    return {
+        "job_id": job["job_id"],
+        "research_type": job["research_type"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "notes": job["notes"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    if job["status"] == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job["status"] != JOB_COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} (stage: {job['stage']})")
+
+    return job["result"]
+
 # ----------------------------
 # Local Run
 # ----------------------------
@@ -0,0 +1,103 @@
+"""
+Per-call overhead of Tavily searches: building 12 clients on every search (the old
+_initialize_clients path) vs. reusing the process-wide TavilyClientRegistry.
+
+Runs against a local plain-HTTP stub of the Tavily API so it needs no keys and measures
+only client construction + connection setup, not Tavily's own latency. Against
+api.tavily.com every new connection also pays a TLS handshake, which keep-alive saves too.
+
+    python -m benchmarks.tavily_client_overhead --calls 200
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tavily import TavilyClient
+from tools.tavily import TavilyClientRegistry
+
+
+FAKE_KEYS = [f"tvly-bench-{index}" for index in range(12)]
+STUB_RESPONSE = json.dumps({"query": "q", "answer": "a", "results": [], "response_time": 0.0}).encode()
+
+
+class _StubTavilyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like api.tavily.com
+    disable_nagle_algorithm = True  # otherwise delayed ACKs dominate keep-alive timings
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def _search(client: TavilyClient) -> None:
+    client.search(query="benchmark", search_depth="advanced", max_results=20)
+
+
+def bench_rebuild_per_call(base_url: str, calls: int) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        clients = [TavilyClient(api_key=key, api_base_url=base_url) for key in FAKE_KEYS]
+        _search(clients[0])
+        timings.append(time.perf_counter() - started)
+        for client in clients:
+            client.close()
+    return timings
+
+
+def bench_registry(base_url: str, calls: int) -> list[float]:
+    registry = TavilyClientRegistry(api_base_url=base_url)
+    registry.start(FAKE_KEYS)
+    timings = []
+    try:
+        for _ in range(calls):
+            started = time.perf_counter()
+            _, client = registry.clients_for(FAKE_KEYS)[0]
+            _search(client)
+            timings.append(time.perf_counter() - started)
+    finally:
+        registry.close()
+    return timings
+
+
+def _report(name: str, timings: list[float]) -> float:
+    timings_ms = sorted(t * 1000 for t in timings)
+    p50 = statistics.median(timings_ms)
+    p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+    print(f"{name:<28} p50 {p50:8.3f} ms   p95 {p95:8.3f} ms   mean {statistics.mean(timings_ms):8.3f} ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubTavilyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        # warm-up: imports, DNS, first connection
+        bench_registry(base_url, 5)
+        bench_rebuild_per_call(base_url, 5)
+
+        before = _report("12 clients per call (before)", bench_rebuild_per_call(base_url, args.calls))
+        after = _report("client registry (after)", bench_registry(base_url, args.calls))
+        print(f"per-call overhead saved: {before - after:.3f} ms (p50), {before / after:.1f}x faster")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
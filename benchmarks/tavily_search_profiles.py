@@ -0,0 +1,106 @@
+"""
+Latency and post-filter yield of each Tavily search profile (tools/tavily.py SEARCH_PROFILES).
+
+Every sample query is searched once per profile and round, straight through the transport
+(no search cache, no hedging), ingested into SearchRecords and filtered the way the
+pipeline does: filter_results (score > 0.90 and the entity name in the content) and
+weak_filter_results (score only). Also reports the response size before / after ingestion.
+Needs real Tavily keys (TAVILY_API_KEY...) and spends credits: 2 per advanced search,
+1 per basic one.
+
+    python -m benchmarks.tavily_search_profiles --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from helper.run_budget import TAVILY_CREDITS
+from helper.websearch_filter import filter_results, weak_filter_results
+from tools.search_records import ingest_search_response, search_response_to_json
+from tools.tavily import (
+    SEARCH_PROFILES, TEST_TAVILY_KEYS, _search, tavily_client_registry,
+)
+from helper.http_sessions import http_sessions
+
+
+# (entity name, query) pairs shaped like step0 and research-round searches
+SAMPLE_QUERIES = [
+    ("Zomato", "About ('Zomato' 'industry=food delivery | country=India') -inurl:hiring -inurl:jobs -inurl:careers"),
+    ("Zomato", "company ('Zomato') revenue fiscal 2024"),
+    ("Satya Nadella", "About ('Satya Nadella' 'company=Microsoft | role=CEO') -inurl:hiring -inurl:jobs"),
+    ("Satya Nadella", "person ('Satya Nadella') recent interviews on AI strategy"),
+    ("Stripe", "company ('Stripe') product launches 2025"),
+    ("Stripe", "company ('Stripe') leadership changes"),
+]
+
+
+async def bench_profile(profile: str, rounds: int) -> dict:
+    clients = tavily_client_registry.clients_for(TEST_TAVILY_KEYS)
+    if not clients:
+        raise SystemExit("No Tavily API keys configured (TAVILY_API_KEY, TAVILY_API_KEY2, ...)")
+
+    timings, results, strict, weak, raw_kb, kept_kb, failures = [], [], [], [], [], [], 0
+    for round_index in range(rounds):
+        for query_index, (name, query) in enumerate(SAMPLE_QUERIES):
+            _, client = clients[(round_index * len(SAMPLE_QUERIES) + query_index) % len(clients)]
+            started = time.perf_counter()
+            try:
+                response, payload_bytes = await _search(client, query, profile)
+            except Exception as e:
+                print(f"❌ {profile}: '{query}' failed: {e}")
+                failures += 1
+                continue
+            timings.append(time.perf_counter() - started)
+            # the thread transport does not see the payload: size the parsed response instead
+            raw_kb.append((payload_bytes if payload_bytes is not None else len(json.dumps(response))) / 1024)
+            response = ingest_search_response(response)
+            kept_kb.append(len(json.dumps(search_response_to_json(response))) / 1024)
+            results.append(len(response.get("results", [])))
+            strict.append(len(await filter_results(data=response, keyword=name)))
+            weak.append(len(await weak_filter_results(data=response)))
+
+    return {
+        "timings": timings, "results": results, "strict": strict, "weak": weak,
+        "raw_kb": raw_kb, "kept_kb": kept_kb, "failures": failures,
+    }
+
+
+def _report(profile: str, stats: dict) -> None:
+    if not stats["timings"]:
+        print(f"{profile:<10} no successful searches")
+        return
+    timings_ms = sorted(t * 1000 for t in stats["timings"])
+    p50 = statistics.median(timings_ms)
+    p95 = timings_ms[max(0, int(len(timings_ms) * 0.95) - 1)]
+    credits = TAVILY_CREDITS[SEARCH_PROFILES[profile]["search_depth"]]
+    print(
+        f"{profile:<10} p50 {p50:8.0f} ms   p95 {p95:8.0f} ms   "
+        f"results {statistics.mean(stats['results']):5.1f}   "
+        f"kept (name+score) {statistics.mean(stats['strict']):5.2f}   "
+        f"kept (score) {statistics.mean(stats['weak']):5.2f}   "
+        f"KB raw {statistics.mean(stats['raw_kb']):6.1f} / ingested {statistics.mean(stats['kept_kb']):6.1f}   "
+        f"credits/search {credits}   failures {stats['failures']}"
+    )
+
+
+async def main_async(profiles: list[str], rounds: int) -> None:
+    try:
+        for profile in profiles:
+            _report(profile, await bench_profile(profile, rounds))
+    finally:
+        await http_sessions.close()
+        tavily_client_registry.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--profiles", nargs="+", default=list(SEARCH_PROFILES), choices=list(SEARCH_PROFILES))
+    args = parser.parse_args()
+    asyncio.run(main_async(args.profiles, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
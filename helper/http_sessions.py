@@ -0,0 +1,100 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+import aiohttp
+
+
+# Defaults for upstream hosts that were not configured explicitly
+HTTP_MAX_CONNECTIONS_PER_HOST = max(1, int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20")))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+# Seconds a resolved address is reused before DNS is asked again
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+
+
+class _HostSession:
+    def __init__(self, session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop):
+        self.session = session
+        self.loop = loop
+
+
+class HTTPSessionManager:
+    """
+    One pooled aiohttp session per upstream host (scheme://host:port) for every outbound
+    call, so connections — and their TLS handshakes — are reused across requests.
+    Each host gets its own connection limit and keep-alive (`configure`), and resolved
+    addresses are cached for HTTP_DNS_CACHE_TTL seconds.
+
+    Started and closed by the FastAPI lifespan. Sessions are created on first use in the
+    running loop (and again in a new loop), so scripts running without the app work too.
+    Only used from the event loop, hence no locking.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._limits: dict[str, dict] = {}
+        self._sessions: dict[str, _HostSession] = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def configure(self, url: str, max_connections: Optional[int] = None, keepalive_timeout: Optional[float] = None) -> None:
+        """Connection limit / keep-alive for the host of `url`; applies to sessions created afterwards."""
+        limits = self._limits.setdefault(self._origin(url), {})
+        if max_connections is not None:
+            limits["max_connections"] = max(1, max_connections)
+        if keepalive_timeout is not None:
+            limits["keepalive_timeout"] = keepalive_timeout
+
+    def session(self, url: str) -> aiohttp.ClientSession:
+        """The pooled session for the host of `url`."""
+        origin = self._origin(url)
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(origin)
+        if entry is not None and not entry.session.closed and entry.loop is loop:
+            return entry.session
+
+        limits = self._limits.get(origin, {})
+        connector = aiohttp.TCPConnector(
+            limit=limits.get("max_connections", self.max_connections_per_host),
+            keepalive_timeout=limits.get("keepalive_timeout", self.keepalive_timeout),
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        self._sessions[origin] = _HostSession(session, loop)
+        return session
+
+    async def start(self) -> None:
+        """Creates the sessions of every configured host up front, in the app's loop."""
+        for origin in self._limits:
+            self.session(origin)
+        print(f"✅ Outbound HTTP sessions ready for {len(self._limits)} hosts")
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        sessions, self._sessions = self._sessions, {}
+        for entry in sessions.values():
+            # sessions of another (finished) loop cannot be closed from this one
+            if entry.loop is loop and not entry.session.closed:
+                await entry.session.close()
+
+    def stats(self) -> dict:
+        return {
+            origin: {"max_connections": entry.session.connector.limit}
+            for origin, entry in self._sessions.items()
+            if not entry.session.closed
+        }
+
+
+http_sessions = HTTPSessionManager()
@@ -0,0 +1,205 @@
+import threading
+from typing import Callable, Optional
+
+
+# Latency buckets (seconds) shared by every duration histogram: outbound calls take
+# tens of milliseconds to a few minutes, whole research runs up to several minutes
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: tuple, label_values: tuple, le: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Every metric registers itself here on creation
+REGISTRY: list["_Metric"] = []
+
+
+class _Metric:
+    """
+    Base of the Prometheus-style metrics below. Children are keyed by label values;
+    updates take a lock because LinkedIn / Tavily calls record from worker threads.
+    """
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_child(key, value))
+        return lines
+
+    def _render_child(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A gauge either set explicitly or, with `function`, read on every scrape."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        if self.function is not None:
+            try:
+                self.set(self.function())
+            except Exception as e:
+                print(f"⚠️ Gauge '{self.name}' callback failed: {e}")
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            child = self._values.get(key)
+            if child is None:
+                child = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    child["counts"][index] += 1
+            child["sum"] += value
+            child["count"] += 1
+
+    def _render_child(self, key: tuple, child: dict) -> list[str]:
+        lines = [
+            f"{self.name}_bucket{_format_labels(self.label_names, key, _format_value(bound))} {count}"
+            for bound, count in zip(self.buckets, child["counts"])
+        ]
+        lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, '+Inf')} {child['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(child['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {child['count']}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ─────────────────────────────────────────────
+# METRICS
+# ─────────────────────────────────────────────
+
+# pipeline
+RESEARCH_REQUESTS = Counter(
+    "research_requests_total", "Research invocations by research_type and outcome",
+    ("research_type", "status"),
+)
+RESEARCH_DURATION = Histogram(
+    "research_duration_seconds", "Duration of research invocations",
+    ("research_type",),
+)
+RESEARCH_IN_FLIGHT = Gauge("research_in_flight", "Research invocations currently running")
+STAGE_DURATION = Histogram(
+    "research_stage_duration_seconds", "Duration of pipeline stages, retries included",
+    ("stage", "status"),
+)
+
+# Tavily
+TAVILY_REQUESTS = Counter(
+    "tavily_requests_total", "Tavily searches by API key index and outcome",
+    ("key_index", "outcome"),
+)
+TAVILY_FALLBACKS = Counter(
+    "tavily_fallbacks_total", "Searches moved on to the next API key after this key failed",
+    ("key_index",),
+)
+TAVILY_HEDGES = Counter(
+    "tavily_hedges_total", "Duplicate searches sent on another key after the p95 latency, by which request won",
+    ("winner",),
+)
+TAVILY_DURATION = Histogram(
+    "tavily_request_duration_seconds", "Tavily search latency by API key index",
+    ("key_index",),
+)
+
+# LinkedIn
+LINKEDIN_RESPONSES = Counter(
+    "linkedin_responses_total", "LinkedIn API responses by endpoint and status code",
+    ("endpoint", "status_code"),
+)
+LINKEDIN_DURATION = Histogram(
+    "linkedin_request_duration_seconds", "LinkedIn API latency by endpoint",
+    ("endpoint",),
+)
+LINKEDIN_RESOLUTIONS = Counter(
+    "linkedin_resolutions_total", "Person LinkedIn usernames by the source that resolved them first",
+    ("source",),
+)
+
+# Bedrock
+BEDROCK_REQUESTS = Counter(
+    "bedrock_requests_total", "Bedrock structured-output calls by output model and outcome",
+    ("output_model", "outcome"),
+)
+BEDROCK_DURATION = Histogram(
+    "bedrock_request_duration_seconds", "Bedrock call latency by output model",
+    ("output_model",),
+)
+BEDROCK_TOKENS = Counter(
+    "bedrock_tokens_total", "Bedrock tokens by direction (input / output)",
+    ("direction",),
+)
+
+# MPNet
+MPNET_ENCODE_BATCH_SIZE = Histogram(
+    "mpnet_encode_batch_size", "Documents per MPNet encode call",
+    buckets=SIZE_BUCKETS,
+)
+MPNET_ENCODE_DURATION = Histogram("mpnet_encode_duration_seconds", "MPNet encode latency")
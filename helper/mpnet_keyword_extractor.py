@@ -5,6 +5,9 @@ from sklearn.cluster import DBSCAN
 import numpy as np
 from helper.mpnet_helper import mpnet_helper_dict
 import threading
+from helper.tracing import span
+from helper.metrics import MPNET_ENCODE_BATCH_SIZE, MPNET_ENCODE_DURATION
+import time
 
 
 # -------------------- Singleton Model --------------------
@@ -96,13 +99,18 @@ class MPNetExtractor:
                     print(f"❌ Failed to extract text from document '{doc}': {e}")
                     texts.append("")  # preserve index alignment
 
-            return self.model.encode(
-                texts,
-                convert_to_tensor=True,
-                batch_size=batch_size,
-                normalize_embeddings=True,
-                show_progress_bar=len(documents) > 100
-            )
+            started = time.perf_counter()
+            with span("mpnet.encode", documents=len(texts), batch_size=batch_size):
+                embeddings = self.model.encode(
+                    texts,
+                    convert_to_tensor=True,
+                    batch_size=batch_size,
+                    normalize_embeddings=True,
+                    show_progress_bar=len(documents) > 100
+                )
+            MPNET_ENCODE_BATCH_SIZE.observe(len(texts))
+            MPNET_ENCODE_DURATION.observe(time.perf_counter() - started)
+            return embeddings
         except Exception as e:
             raise RuntimeError(f"❌ _encode_documents failed: {e}")
 
@@ -233,9 +241,11 @@ class MPNetExtractor:
                         print(f"⚠️ Not enough documents ({len(documents)}) for clustering (min={cluster_min_samples}) — falling back to score mode.")
                         return self._score_and_rank(documents, doc_embeddings, top_n, min_score)
 
-                    embeddings_np = doc_embeddings.cpu().numpy()
-                    clustering = DBSCAN(eps=cluster_eps, min_samples=cluster_min_samples, metric='cosine')
-                    labels = clustering.fit_predict(embeddings_np)
+                    with span("mpnet.cluster", documents=len(documents), eps=cluster_eps) as cluster_span:
+                        embeddings_np = doc_embeddings.cpu().numpy()
+                        clustering = DBSCAN(eps=cluster_eps, min_samples=cluster_min_samples, metric='cosine')
+                        labels = clustering.fit_predict(embeddings_np)
+                        cluster_span.set_attributes(clusters=len(set(labels.tolist()) - {-1}))
 
                     unique_labels = labels[labels != -1]
                     if len(unique_labels) == 0:
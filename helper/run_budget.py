@@ -0,0 +1,183 @@
+from dotenv import load_dotenv
+load_dotenv()
+import contextvars
+import os
+import time
+from typing import Optional
+
+
+# Cost/latency estimates used to plan a run before anything has been observed
+EST_LLM_CALL_SECONDS = float(os.getenv("EST_LLM_CALL_SECONDS", "25"))
+EST_LLM_CALL_TOKENS = int(os.getenv("EST_LLM_CALL_TOKENS", "30000"))
+EST_SEARCH_SECONDS = {
+    "advanced": float(os.getenv("EST_ADVANCED_SEARCH_SECONDS", "10")),
+    "basic": float(os.getenv("EST_BASIC_SEARCH_SECONDS", "4")),
+}
+# Tavily credits per search by search_depth
+TAVILY_CREDITS = {"advanced": 2, "basic": 1}
+
+
+class RunBudget:
+    """
+    Latency deadline and spend limits (LLM tokens, Tavily credits) of one research run.
+    Any limit left as None is unbounded. Outbound callers charge what they spend and
+    derive their timeouts from the time left.
+    """
+
+    def __init__(
+        self,
+        deadline_s: Optional[float] = None,
+        max_llm_tokens: Optional[int] = None,
+        max_tavily_credits: Optional[int] = None,
+    ):
+        self.started_at = time.monotonic()
+        self.deadline_at = self.started_at + deadline_s if deadline_s else None
+        self.max_llm_tokens = max_llm_tokens
+        self.max_tavily_credits = max_tavily_credits
+
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.llm_input_tokens = 0
+        self.llm_output_tokens = 0
+        self.tavily_searches = 0
+        self.tavily_credits = 0
+
+    # ─────────────── remaining ───────────────
+
+    def remaining_seconds(self) -> Optional[float]:
+        if self.deadline_at is None:
+            return None
+        return max(0.0, self.deadline_at - time.monotonic())
+
+    def remaining_llm_tokens(self) -> Optional[int]:
+        if self.max_llm_tokens is None:
+            return None
+        return max(0, self.max_llm_tokens - self.llm_input_tokens - self.llm_output_tokens)
+
+    def remaining_tavily_credits(self) -> Optional[int]:
+        if self.max_tavily_credits is None:
+            return None
+        return max(0, self.max_tavily_credits - self.tavily_credits)
+
+    def exhausted_reason(self) -> Optional[str]:
+        if self.remaining_seconds() == 0:
+            return "deadline reached"
+        if self.remaining_llm_tokens() == 0:
+            return "LLM token budget spent"
+        if self.remaining_tavily_credits() == 0:
+            return "Tavily credit budget spent"
+        return None
+
+    # ─────────────── spending ───────────────
+
+    def charge_llm(self, input_tokens: int, output_tokens: int, seconds: float) -> None:
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+        self.llm_input_tokens += input_tokens
+        self.llm_output_tokens += output_tokens
+
+    def charge_tavily(self, search_depth: str) -> None:
+        self.tavily_searches += 1
+        self.tavily_credits += TAVILY_CREDITS.get(search_depth, 1)
+
+    def llm_call_estimate(self) -> tuple[float, int]:
+        """(seconds, tokens) expected for the next LLM call, from this run's average so far."""
+        if not self.llm_calls:
+            return EST_LLM_CALL_SECONDS, EST_LLM_CALL_TOKENS
+        return (
+            self.llm_seconds / self.llm_calls,
+            (self.llm_input_tokens + self.llm_output_tokens) // self.llm_calls,
+        )
+
+    # ─────────────── planning ───────────────
+
+    def plan_num_queries(self, default: int, concurrency: int) -> int:
+        """
+        How many queries the next analysis round should ask for so that searching them
+        plus the following analysis still fits the remaining time, credits and tokens.
+        """
+        llm_seconds, llm_tokens = self.llm_call_estimate()
+
+        # the analysis call producing the queries and the one consuming their results
+        tokens_left = self.remaining_llm_tokens()
+        if tokens_left is not None and tokens_left < 2 * llm_tokens:
+            return 0
+
+        num_queries = default
+        credits_left = self.remaining_tavily_credits()
+        if credits_left is not None:
+            num_queries = min(num_queries, credits_left // TAVILY_CREDITS["basic"])
+
+        seconds_left = self.remaining_seconds()
+        if seconds_left is not None:
+            seconds_for_search = seconds_left - 2 * llm_seconds
+            if seconds_for_search < EST_SEARCH_SECONDS["basic"]:
+                return 0
+            waves = int(seconds_for_search // EST_SEARCH_SECONDS["basic"])
+            num_queries = min(num_queries, waves * concurrency)
+
+        return max(0, num_queries)
+
+    def plan_search(self, num_queries: int, concurrency: int) -> tuple[int, str]:
+        """
+        (number of queries to run, search_depth) for a search round: advanced when both the
+        credits and the time left allow it, otherwise basic, dropping queries that do not fit.
+        """
+        llm_seconds, _ = self.llm_call_estimate()
+        credits_left = self.remaining_tavily_credits()
+        seconds_left = self.remaining_seconds()
+
+        for search_depth in ("advanced", "basic"):
+            affordable = num_queries
+            if credits_left is not None:
+                affordable = min(affordable, credits_left // TAVILY_CREDITS[search_depth])
+            if seconds_left is not None:
+                seconds_for_search = seconds_left - llm_seconds
+                waves = max(0, int(seconds_for_search // EST_SEARCH_SECONDS[search_depth]))
+                affordable = min(affordable, waves * concurrency)
+            if affordable >= num_queries or search_depth == "basic":
+                return max(0, affordable), search_depth
+
+        return num_queries, "advanced"
+
+    def timeout(self, default: Optional[float]) -> Optional[float]:
+        """`default` capped to the time left before the deadline (at least 1s)."""
+        remaining = self.remaining_seconds()
+        if remaining is None:
+            return default
+        remaining = max(1.0, remaining)
+        return remaining if default is None else min(default, remaining)
+
+    def spend(self) -> dict:
+        return {
+            "elapsed_s": round(time.monotonic() - self.started_at, 3),
+            "llm_calls": self.llm_calls,
+            "llm_input_tokens": self.llm_input_tokens,
+            "llm_output_tokens": self.llm_output_tokens,
+            "tavily_searches": self.tavily_searches,
+            "tavily_credits": self.tavily_credits,
+        }
+
+
+# Budget of the run the current task belongs to; tasks created by the run inherit it
+current_run_budget: contextvars.ContextVar[Optional[RunBudget]] = contextvars.ContextVar(
+    "current_run_budget", default=None
+)
+
+
+def outbound_timeout(default: Optional[float]) -> Optional[float]:
+    """Timeout for an outbound call: `default`, capped to the current run's remaining time."""
+    budget = current_run_budget.get()
+    return budget.timeout(default) if budget else default
+
+
+def charge_llm_usage(input_tokens: int, output_tokens: int, seconds: float) -> None:
+    budget = current_run_budget.get()
+    if budget:
+        budget.charge_llm(input_tokens, output_tokens, seconds)
+
+
+def charge_tavily_search(search_depth: str) -> None:
+    budget = current_run_budget.get()
+    if budget:
+        budget.charge_tavily(search_depth)
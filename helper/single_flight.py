@@ -0,0 +1,46 @@
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, Hashable
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cases and collapses whitespace so trivially different spellings share a key."""
+    return re.sub(r"\s+", " ", query or "").strip().lower()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight task.
+    The first caller starts the task; later callers await the same result.
+    The task is shielded, so a caller that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(coro_factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            print(f"🔁 Coalesced request onto in-flight run for key {key!r}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        # mark the exception as retrieved even if every caller went away before it finished
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
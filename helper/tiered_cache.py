@@ -0,0 +1,235 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class TieredCache:
+    """
+    Two-tier TTL cache for JSON-serializable values.
+
+    - memory tier: LRU, evicted by total payload bytes (`max_bytes`)
+    - disk tier:   SQLite table `name` in `db_path`, so entries survive restarts;
+                   pruned of expired entries and capped at `disk_max_bytes`
+
+    Values are stored as (optionally zlib-compressed) JSON. `ttl` is in seconds.
+    With `stale_ttl`, entries are kept that much longer past their TTL and served as
+    stale by `get_stale` (for stale-while-revalidate); `get` never returns them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_bytes: int,
+        db_path: Optional[str] = None,
+        disk_max_bytes: int = 0,
+        compress: bool = True,
+        stale_ttl: float = 0,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self.disk_max_bytes = disk_max_bytes
+        self.compress = compress
+
+        self._memory: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db_initialized = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    # ─────────────── serialization ───────────────
+
+    def _encode(self, value: Any) -> bytes:
+        payload = json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+        return zlib.compress(payload, 6) if self.compress else payload
+
+    def _decode(self, payload: bytes) -> Any:
+        if self.compress:
+            payload = zlib.decompress(payload)
+        return json.loads(payload)
+
+    # ─────────────── memory tier ───────────────
+
+    def _memory_get(self, key: str) -> Optional[tuple[float, bytes]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_set(self, key: str, stored_at: float, payload: bytes) -> None:
+        with self._lock:
+            # drop the superseded value first, even when the new one is too large to keep here
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+            if len(payload) > self.max_bytes:
+                return
+            self._memory[key] = (stored_at, payload)
+            self._memory_bytes += len(payload)
+            while self._memory_bytes > self.max_bytes and self._memory:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _memory_delete(self, key: str) -> None:
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+
+    # ─────────────── disk tier ───────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._db_initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.name} (
+                    key         TEXT PRIMARY KEY,
+                    stored_at   REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size        INTEGER NOT NULL,
+                    payload     BLOB NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._db_initialized = True
+        return conn
+
+    def _disk_get(self, key: str) -> Optional[tuple[float, bytes]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT stored_at, payload FROM {self.name} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"UPDATE {self.name} SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return row[0], row[1]
+        finally:
+            conn.close()
+
+    def _disk_set(self, key: str, stored_at: float, payload: bytes) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.name} (key, stored_at, accessed_at, size, payload) VALUES (?, ?, ?, ?, ?)",
+                (key, stored_at, stored_at, len(payload), sqlite3.Binary(payload)),
+            )
+            conn.execute(f"DELETE FROM {self.name} WHERE stored_at < ?", (time.time() - self.ttl - self.stale_ttl,))
+            if self.disk_max_bytes:
+                total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.name}").fetchone()[0]
+                if total > self.disk_max_bytes:
+                    # drop least recently used rows until back under the limit
+                    rows = conn.execute(f"SELECT key, size FROM {self.name} ORDER BY accessed_at").fetchall()
+                    to_delete = []
+                    for row_key, size in rows:
+                        if total <= self.disk_max_bytes:
+                            break
+                        to_delete.append((row_key,))
+                        total -= size
+                    conn.executemany(f"DELETE FROM {self.name} WHERE key = ?", to_delete)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _disk_delete(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ─────────────── public API ───────────────
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl
+
+    async def _lookup(self, key: str, max_age: float) -> Optional[tuple[float, bytes, str]]:
+        """(stored_at, payload, tier) of an entry younger than `max_age` seconds."""
+        entry = self._memory_get(key)
+        if entry is not None and time.time() - entry[0] < max_age:
+            return entry[0], entry[1], "memory"
+
+        if self.db_path:
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key)
+            except Exception as e:
+                print(f"❌ {self.name} disk read failed: {e}")
+                entry = None
+            if entry is not None and time.time() - entry[0] < max_age:
+                self._memory_set(key, entry[0], entry[1])
+                return entry[0], entry[1], "disk"
+
+        return None
+
+    async def get(self, key: str, record_stats: bool = True) -> Optional[Any]:
+        """Returns the cached value, or None when missing or older than the TTL."""
+        found = await self._lookup(key, self.ttl)
+        if record_stats:
+            if found is None:
+                self.misses += 1
+            elif found[2] == "memory":
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+        return self._decode(found[1]) if found is not None else None
+
+    async def get_stale(self, key: str) -> Optional[tuple[Any, bool]]:
+        """(value, fresh) of an entry within its TTL plus `stale_ttl`, or None."""
+        found = await self._lookup(key, self.ttl + self.stale_ttl)
+        if found is None:
+            self.misses += 1
+            return None
+        fresh = self._fresh(found[0])
+        if not fresh:
+            self.stale_hits += 1
+        elif found[2] == "memory":
+            self.memory_hits += 1
+        else:
+            self.disk_hits += 1
+        return self._decode(found[1]), fresh
+
+    async def set(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        stored_at = time.time()
+        payload = self._encode(value)
+        self._memory_set(key, stored_at, payload)
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._disk_set, key, stored_at, payload)
+            except Exception as e:
+                print(f"❌ {self.name} disk write failed: {e}")
+
+    async def delete(self, key: str) -> None:
+        self._memory_delete(key)
+        if self.db_path:
+            try:
+                await asyncio.to_thread(self._disk_delete, key)
+            except Exception as e:
+                print(f"❌ {self.name} disk delete failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
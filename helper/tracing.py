@@ -0,0 +1,228 @@
+from dotenv import load_dotenv
+load_dotenv()
+import contextvars
+import functools
+import inspect
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import requests
+
+
+# OTLP/JSON export: a file gets one trace document per line, a collector gets them POSTed
+# (e.g. http://localhost:4318/v1/traces). Both unset = traces only live in memory.
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "deep-research")
+# Finished traces kept in memory for /runs/{run_id}/trace and the debug header
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "256"))
+# String attributes (queries, urls) are cut to this many characters on export
+TRACE_MAX_ATTRIBUTE_CHARS = 512
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+
+class Span:
+    def __init__(self, trace: "Trace", name: str, parent: Optional["Span"], kind: int, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        # span that was current before a root span was started, restored by finish_trace
+        self.previous: Optional[Span] = None
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, e: BaseException) -> None:
+        self.error = f"{type(e).__name__}: {e}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Returned by span() outside of any trace, so call sites never need to check."""
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+    def record_error(self, e: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: list[Span] = []
+
+    def start_span(self, name: str, parent: Optional[Span], kind: int, attributes: dict) -> Span:
+        span = Span(self, name, parent, kind, attributes)
+        self.spans.append(span)
+        return span
+
+    def server_timing(self) -> str:
+        """Per-name breakdown in Server-Timing header syntax: total time and call count of every span name."""
+        totals: "OrderedDict[str, list]" = OrderedDict()
+        for span in self.spans:
+            entry = totals.setdefault(span.name, [0.0, 0])
+            entry[0] += span.duration_ms
+            entry[1] += 1
+        return ", ".join(
+            f'{name};dur={duration:.1f};desc="{count}x"'
+            for name, (duration, count) in totals.items()
+        )
+
+    def to_otlp(self) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": TRACE_SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": TRACE_SERVICE_NAME},
+                    "spans": [_otlp_span(self.trace_id, span) for span in self.spans],
+                }],
+            }]
+        }
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)[:TRACE_MAX_ATTRIBUTE_CHARS]}
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _otlp_span(trace_id: str, span: Span) -> dict:
+    otlp_span = {
+        "traceId": trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        otlp_span["parentSpanId"] = span.parent_id
+    return otlp_span
+
+
+# ─────────────────────────────────────────────
+# CONTEXT
+# ─────────────────────────────────────────────
+
+# Innermost open span of the current task; tasks and to_thread calls inherit it
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+_recent_traces: "OrderedDict[str, Trace]" = OrderedDict()
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-export")
+
+
+def start_trace(name: str, **attributes) -> Span:
+    """
+    Opens the root span of a new trace and makes it the current span.
+    Meant for async generators, where a `with` block cannot span the yields:
+    close it with finish_trace().
+    """
+    root = Trace().start_span(name, None, SPAN_KIND_INTERNAL, attributes)
+    root.previous = current_span.get()
+    current_span.set(root)
+    return root
+
+
+def finish_trace(root: Span) -> None:
+    """Ends the root span, keeps the trace for lookups and exports it in the background."""
+    root.end()
+    current_span.set(root.previous)
+
+    trace = root.trace
+    _recent_traces[trace.trace_id] = trace
+    while len(_recent_traces) > TRACE_KEEP:
+        _recent_traces.popitem(last=False)
+
+    if TRACE_EXPORT_PATH or TRACE_EXPORT_URL:
+        _export_executor.submit(_export, trace.to_otlp())
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    return _recent_traces.get(trace_id)
+
+
+def _export(document: dict) -> None:
+    try:
+        if TRACE_EXPORT_PATH:
+            with open(TRACE_EXPORT_PATH, "a") as f:
+                f.write(json.dumps(document, default=str) + "\n")
+        if TRACE_EXPORT_URL:
+            requests.post(TRACE_EXPORT_URL, json=document, timeout=5).raise_for_status()
+    except Exception as e:
+        print(f"⚠️ Trace export failed: {e}")
+
+
+@contextmanager
+def span(name: str, client: bool = False, **attributes):
+    """
+    Child span of the current span, for the duration of the block. Exceptions leaving
+    the block mark the span as failed. Outside of a trace this is a no-op.
+    """
+    parent = current_span.get()
+    if parent is None:
+        yield _NOOP_SPAN
+        return
+
+    child = parent.trace.start_span(name, parent, SPAN_KIND_CLIENT if client else SPAN_KIND_INTERNAL, attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_error(e)
+        raise
+    finally:
+        child.end()
+        current_span.reset(token)
+
+
+def traced(name: str, client: bool = False):
+    """Decorator: runs every call of a sync or async function inside span(name)."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, client=client):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, client=client):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -5,13 +5,8 @@ async def filter_results(data: dict, keyword: str) -> list[dict]:
     overall = []
     results = data.get("results",[])
     for item in results:
-        if item.get("score", 0) > 0.90 and pattern.search(item.get("content", "")):
-            overall.append({
-                "url":     item.get("url"),
-                "title":   item.get("title"),
-                "content": item.get("content"),
-                "score":   item.get("score"),
-            })
+        if item.score > 0.90 and pattern.search(item.content):
+            overall.append(item.to_dict())
 
     return overall
 
@@ -19,13 +14,8 @@ async def weak_filter_results(data: dict) -> list[dict]:
     overall = []
     results = data.get("results",[])
     for item in results:
-        if item.get("score", 0) > 0.90:
-            overall.append({
-                "url":     item.get("url"),
-                "title":   item.get("title"),
-                "content": item.get("content"),
-                "score":   item.get("score"),
-            })
+        if item.score > 0.90:
+            overall.append(item.to_dict())
 
     return overall
 
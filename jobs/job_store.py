@@ -0,0 +1,129 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """SQLite-backed job state. Every call opens its own connection and runs in a worker thread."""
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id        TEXT PRIMARY KEY,
+                    research_type TEXT NOT NULL,
+                    query         TEXT NOT NULL,
+                    options       TEXT NOT NULL DEFAULT '{}',
+                    status        TEXT NOT NULL,
+                    stage         TEXT,
+                    notes         TEXT NOT NULL DEFAULT '[]',
+                    result        TEXT,
+                    error         TEXT,
+                    created_at    TEXT NOT NULL,
+                    updated_at    TEXT NOT NULL
+                )
+                """
+            )
+            try:
+                # databases created before the options column existed
+                conn.execute("ALTER TABLE jobs ADD COLUMN options TEXT NOT NULL DEFAULT '{}'")
+            except sqlite3.OperationalError:
+                pass
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _fetch(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        return {
+            "job_id": row["job_id"],
+            "research_type": row["research_type"],
+            "query": row["query"],
+            "options": json.loads(row["options"]),
+            "status": row["status"],
+            "stage": row["stage"],
+            "notes": json.loads(row["notes"]),
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    async def create_job(self, research_type: str, query: str, options: Optional[dict] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = _now()
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO jobs (job_id, research_type, query, options, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, research_type, query, json.dumps(options or {}), JOB_QUEUED, now, now),
+        )
+        return job_id
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        rows = await asyncio.to_thread(self._fetch, "SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return self._row_to_job(rows[0]) if rows else None
+
+    async def list_unfinished_job_ids(self) -> list[str]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (JOB_QUEUED, JOB_RUNNING),
+        )
+        return [row["job_id"] for row in rows]
+
+    async def update_job(self, job_id: str, **fields) -> None:
+        """Updates status / stage / notes / result / error of a job."""
+        for key in ("notes", "result"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key], default=str)
+        fields["updated_at"] = _now()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        await asyncio.to_thread(
+            self._execute,
+            f"UPDATE jobs SET {assignments} WHERE job_id = ?",
+            (*fields.values(), job_id),
+        )
+
+
+job_store = JobStore()
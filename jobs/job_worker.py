@@ -0,0 +1,117 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import os
+import traceback
+from typing import Optional
+from jobs.job_store import job_store, JobStore, JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED
+from main import research_events
+from helper.metrics import Gauge
+
+
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "2")))
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT", "30"))
+
+# stage events that carry a batch of new notes
+NOTE_EVENTS = {"shallow", "intermediate", "deep"}
+
+
+class JobWorkerPool:
+    """
+    Bounded pool of in-process asyncio workers consuming research jobs from a queue.
+    Unfinished jobs found in the store on start are re-queued, so a restart resumes them.
+    """
+
+    def __init__(self, store: JobStore = job_store, num_workers: int = JOB_WORKERS):
+        self.store = store
+        self.num_workers = num_workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self.accepting = False
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        for job_id in await self.store.list_unfinished_job_ids():
+            await self.store.update_job(job_id, status=JOB_QUEUED)
+            self._queue.put_nowait(job_id)
+        self._workers = [
+            asyncio.create_task(self._worker(index))
+            for index in range(self.num_workers)
+        ]
+        self.accepting = True
+        print(f"✅ Job worker pool started with {self.num_workers} workers, {self._queue.qsize()} re-queued jobs")
+
+    def queued(self) -> int:
+        """Jobs waiting for a free worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, research_type: str, query: str, options: Optional[dict] = None) -> str:
+        if not self.accepting:
+            raise RuntimeError("Job worker pool is not accepting new jobs")
+        job_id = await self.store.create_job(research_type=research_type, query=query, options=options)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def stop(self, drain_timeout: float = JOB_DRAIN_TIMEOUT) -> None:
+        """Stops accepting jobs, lets queued work finish for up to `drain_timeout` seconds, then cancels."""
+        self.accepting = False
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Job drain timed out after {drain_timeout}s — unfinished jobs resume on next start")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                # left as running in the store — picked up again by the next start()
+                raise
+            except Exception as e:
+                print(f"❌ Job worker {index} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        job = await self.store.get_job(job_id)
+        if job is None or job["status"] in (JOB_COMPLETED, JOB_FAILED):
+            return
+
+        await self.store.update_job(job_id, status=JOB_RUNNING, stage=None, notes=[])
+        partial_notes = []
+        try:
+            # the job id doubles as the checkpoint run id, so a re-queued job resumes where it stopped
+            async for stage in research_events(
+                research_type=job["research_type"], query=job["query"], run_id=job_id, options=job["options"]
+            ):
+                if stage["event"] == "run":
+                    continue
+                if stage["event"] == "complete":
+                    await self.store.update_job(
+                        job_id, status=JOB_COMPLETED, stage="complete", result=stage["data"]
+                    )
+                    return
+                if stage["event"] in NOTE_EVENTS:
+                    partial_notes.extend(stage["data"] or [])
+                await self.store.update_job(job_id, stage=stage["event"], notes=partial_notes)
+
+            await self.store.update_job(job_id, status=JOB_COMPLETED, result=partial_notes)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            tb = traceback.format_exc()
+            print(tb)
+            await self.store.update_job(job_id, status=JOB_FAILED, error=str(e))
+
+
+job_worker_pool = JobWorkerPool()
+
+JOBS_QUEUED = Gauge("research_jobs_queued", "Research jobs waiting for a free worker", function=job_worker_pool.queued)
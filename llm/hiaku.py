@@ -5,6 +5,10 @@ from dotenv import load_dotenv
 from typing import Any
 import asyncio
 import json
+import time
+from helper.run_budget import outbound_timeout, charge_llm_usage
+from helper.tracing import span
+from helper.metrics import BEDROCK_REQUESTS, BEDROCK_DURATION, BEDROCK_TOKENS
 
 load_dotenv()
 
@@ -29,11 +33,33 @@ async def claude_haiku(system_prompt: str, user_prompt: str, user_context:str, p
         {"role": "user", "content": user_message},
     ]
 
+    output_model = pydantic_model.__name__
+    started = time.perf_counter()
     try:
-        structured_llm = bedrock_claude.with_structured_output(pydantic_model)
-        response = await structured_llm.ainvoke(messages)
-        result = response.model_dump()
-        return result
+        with span(
+            "bedrock.claude_haiku",
+            client=True,
+            output_model=output_model,
+            prompt_bytes=len(system_prompt) + len(user_message),
+        ) as llm_span:
+            structured_llm = bedrock_claude.with_structured_output(pydantic_model, include_raw=True)
+            response = await asyncio.wait_for(structured_llm.ainvoke(messages), timeout=outbound_timeout(None))
+            usage = getattr(response["raw"], "usage_metadata", None) or {}
+            llm_span.set_attributes(
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+            )
+            elapsed = time.perf_counter() - started
+            BEDROCK_DURATION.observe(elapsed, output_model=output_model)
+            BEDROCK_TOKENS.inc(usage.get("input_tokens", 0), direction="input")
+            BEDROCK_TOKENS.inc(usage.get("output_tokens", 0), direction="output")
+            charge_llm_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0), elapsed)
+            if response["parsed"] is None:
+                raise ValueError(f"structured output parsing failed: {response.get('parsing_error')}")
+            result = response["parsed"].model_dump()
+            BEDROCK_REQUESTS.inc(output_model=output_model, outcome="success")
+            return result
     except Exception as e:
+        BEDROCK_REQUESTS.inc(output_model=output_model, outcome="failure")
         print(f"❌ ERROR: {str(e)}")
         return None
\ No newline at end of file
@@ -1,77 +1,258 @@
-from prompts.intent_prompt_file import intent_prompt
-from processes.step0 import step0_function
-from processes.shallow_prompt import shallow_research_prompt
-from tools.tavily import tavily_web_search_function
-from processes.intermidiate_prompt import intermediate_research_prompt
-from processes.deep_reasearch_prompt import deep_research_prompt
-from helper.query_creator import query_creator_function
-from helper.websearch_filter import filter_results
-from helper.websearch_filter import update_completed_topics
-
-async def main_function(research_type: str, query: str):
-
-    #  research_documantation
-    research = {}
-    
-    user_intent = await intent_prompt(query)
-    print("user_intent: ", user_intent)
-    research["user_intent"] = user_intent
-    research["used_queries"] = []
-    research["research_data"] = []
-    research["DeepResearch"] = []
-    completed_topics = []
-    research = await step0_function(research)
-    print("research step0:  ",research)
-    shallow_reasearch = await shallow_research_prompt(research=research)
-    print("shallow_reasearch:   ",shallow_reasearch)
-    remaining_primary_research_purpose = shallow_reasearch.get("remaining_primary_research_purpose",[])
-    remaining_secondary_research_purpose = shallow_reasearch.get("remaining_primary_research_purpose",[])
-    search_queries = shallow_reasearch.get("search_queries",[])
-    notes = shallow_reasearch.get("notes",[])
-    completed_topics = await update_completed_topics(completed_topics, notes)
-    print("search_queries:  ",search_queries)
-    research["DeepResearch"].extend(notes)
-    if research_type=="Shallow":
-        return research["DeepResearch"]
-    
-
-    step_2_research_data = []
-    for single_query in search_queries:
-        query = await query_creator_function(single_query)
-        data = await tavily_web_search_function(query)
-        filtered_data = await filter_results(data=data, keyword=single_query["name"])
-        print("filtered_data:   ",filtered_data)
-        step_2_research_data.extend(filtered_data)
-        research["used_queries"].append(single_query)
-
-
-    print("type completed_topics 1: ", type(completed_topics))
-    intermidiate_reasearch = await intermediate_research_prompt(research,step_2_research_data, remaining_primary_research_purpose, remaining_secondary_research_purpose, completed_topics)
-    remaining_primary_research_purpose = intermidiate_reasearch.get("remaining_primary_research_purpose",[])
-    remaining_secondary_research_purpose = intermidiate_reasearch.get("remaining_primary_research_purpose",[])
-    search_queries = intermidiate_reasearch.get("search_queries",[])
-    notes = intermidiate_reasearch.get("notes",[])
-    completed_topics = await update_completed_topics(completed_topics, notes)
-    print("search_queries:  ",search_queries)
-    research["DeepResearch"].extend(notes)
-    if research_type=="Intermediate":
-        return research["DeepResearch"]
-    
-
-    step_3_research_data = []
-    for single_query in search_queries:
-        query = await query_creator_function(single_query)
-        data = await tavily_web_search_function(query)
-        filtered_data = await filter_results(data=data, keyword=single_query["name"])
-        print("filtered_data:   ",filtered_data)
-        step_3_research_data.extend(filtered_data)
-        research["used_queries"].append(single_query)
-
-
-    deep_reasearch = await deep_research_prompt(research,step_3_research_data, remaining_primary_research_purpose, remaining_secondary_research_purpose, completed_topics)
-
-    notes = deep_reasearch.get("notes",[])
-    research["DeepResearch"].extend(notes)
-
-    if research_type=="Deep":
-        return research["DeepResearch"]
+from processes.research_graph import get_research_graph, ANALYSIS_KINDS
+from processes.dag import StageGraph, DeadlineExceeded, run_stage_graph
+from processes.checkpoint import checkpoint_store
+from processes.result_cache import get_cached_result, store_result
+from helper.single_flight import SingleFlight, normalize_query
+from helper.run_budget import RunBudget, current_run_budget
+from tools.tavily_scheduler import search_owner
+from helper.tracing import Span, start_trace, finish_trace
+from helper.metrics import RESEARCH_REQUESTS, RESEARCH_DURATION, RESEARCH_IN_FLIGHT
+from typing import AsyncIterator, Optional
+import time
+import uuid
+
+
+def _stage_event(event: str, data, node: Optional[str] = None) -> dict:
+    stage_event = {"event": event, "data": data}
+    if node is not None:
+        stage_event["node"] = node
+    return stage_event
+
+
+def _new_run_state(run_id: str, query: str, options: dict) -> dict:
+    return {
+        "run_id": run_id,
+        "query": query,
+        "options": options,
+        "status": "running",
+        "error": None,
+        "completed_stages": [],
+        "skipped_stages": [],
+        "events": [],
+        "values": {"query": query, "research_options": options},
+        "timings": {},
+    }
+
+
+def _run_budget(options: dict) -> Optional[RunBudget]:
+    """The RunBudget described by a request's deadline_s / max_llm_tokens / max_tavily_credits, if any."""
+    limits = {key: options.get(key) for key in ("deadline_s", "max_llm_tokens", "max_tavily_credits")}
+    if all(value is None for value in limits.values()):
+        return None
+    return RunBudget(**limits)
+
+
+def _events_in_graph(events: list, graph: StageGraph) -> list:
+    return [event for event in events if event.get("node", event["event"]) in graph]
+
+
+def _collect_notes(events: list) -> list:
+    return [
+        note
+        for event in events
+        if event["event"] in ANALYSIS_KINDS
+        for note in (event["data"] or [])
+    ]
+
+
+# ─────────────────────────────────────────────
+# PIPELINE
+# ─────────────────────────────────────────────
+
+async def research_events(
+    research_type: str,
+    query: Optional[str] = None,
+    run_id: Optional[str] = None,
+    options: Optional[dict] = None,
+) -> AsyncIterator[dict]:
+    """
+    Runs the stage graph of `research_type` (see processes/research_graph.py) and yields
+    one event per finished stage: run (with the run_id), intent, step0, shallow,
+    intermediate, deep and finally complete (whose data is the full note list).
+    `options` tunes Adaptive runs (max_rounds, time_budget_s, max_searches) and can bound
+    any run with deadline_s, max_llm_tokens and max_tavily_credits: the number of queries
+    and the search depth of every round are planned to fit, outbound timeouts never go past
+    the deadline, and when the deadline hits the run ends with a deadline event followed by
+    complete with the notes collected so far.
+
+    The run state is checkpointed after every stage. Passing the run_id of an earlier
+    run resumes it at its first incomplete stage: events of already completed stages are
+    replayed from the checkpoint, and a deeper research_type continues where it stopped.
+
+    Every invocation is one trace: a root `research` span with a `stage.<node>` span per
+    stage and spans for the outbound calls made inside. The run event carries its trace_id.
+    """
+    root = start_trace("research", research_type=research_type, query=query, run_id=run_id)
+    RESEARCH_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = "cancelled"
+    try:
+        async for event in _research_events(root, research_type, query, run_id, options):
+            if event["event"] == "run":
+                root.set_attributes(run_id=event["data"]["run_id"], cached=event["data"]["cached"])
+                if event["data"]["cached"]:
+                    status = "cached"
+            elif event["event"] == "deadline":
+                root.set_attributes(deadline_reached=True)
+                status = "timed_out"
+            elif event["event"] == "complete" and status == "cancelled":
+                status = "completed"
+            yield event
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            status = "failed"
+        root.record_error(e)
+        raise
+    finally:
+        finish_trace(root)
+        RESEARCH_IN_FLIGHT.dec()
+        RESEARCH_REQUESTS.inc(research_type=research_type, status=status)
+        RESEARCH_DURATION.observe(time.perf_counter() - started, research_type=research_type)
+
+
+async def _research_events(
+    root: Span,
+    research_type: str,
+    query: Optional[str],
+    run_id: Optional[str],
+    options: Optional[dict],
+) -> AsyncIterator[dict]:
+    trace_id = root.trace.trace_id
+    state = await checkpoint_store.load(run_id) if run_id else None
+    if options is None:
+        options = state.get("options", {}) if state else {}
+    graph = get_research_graph(research_type, options)
+
+    if state is None:
+        if not query:
+            raise ValueError(f"No checkpoint found for run '{run_id}' and no query given")
+
+        cached = await get_cached_result(research_type, query)
+        if cached is not None:
+            print(f"✅ Result cache hit for {research_type} '{query}' (cached {cached['research_type']})")
+            cached_run_id = cached.get("run_id") or run_id or uuid.uuid4().hex
+            yield _stage_event("run", {"run_id": cached_run_id, "resumed_stages": [], "cached": True, "trace_id": trace_id})
+            events = _events_in_graph(cached["events"], graph)
+            for event in events:
+                yield event
+            yield _stage_event("complete", _collect_notes(events))
+            return
+
+        state = _new_run_state(run_id or uuid.uuid4().hex, query, options)
+
+    state["research_type"] = research_type
+    state["options"] = options
+    state["values"]["research_options"] = options
+    # budgets count from this invocation, so a resumed run gets a fresh time budget
+    state["values"]["run_started_at"] = time.time()
+    state["status"] = "running"
+    state["error"] = None
+    state["trace_id"] = trace_id
+    # skip conditions (budget, deadline, adaptive coverage) are re-evaluated on every
+    # invocation, so a resume with a larger or no budget can run what was skipped before
+    state["skipped_stages"] = []
+
+    # outbound calls made for this run (including by the node tasks) read it from the context
+    budget = _run_budget(options)
+    current_run_budget.set(budget)
+    # the search scheduler queues this run's searches fairly against other runs
+    search_owner.set(state["run_id"])
+
+    yield _stage_event("run", {
+        "run_id": state["run_id"],
+        "resumed_stages": list(state["completed_stages"]),
+        "cached": False,
+        "trace_id": trace_id,
+    })
+
+    for event in _events_in_graph(state["events"], graph):
+        yield event
+
+    try:
+        async for node, outputs, timing in run_stage_graph(
+            graph,
+            state["values"],
+            state["completed_stages"],
+            state["skipped_stages"],
+            deadline_at=budget.deadline_at if budget else None,
+        ):
+            state["timings"][node.name] = timing
+            if budget:
+                state["spend"] = budget.spend()
+            event = None
+            if node.event and outputs is not None:
+                event = _stage_event(node.event, node.event_data(outputs), node=node.name)
+                state["events"].append(event)
+            await checkpoint_store.save(state)
+            if event is not None:
+                yield event
+
+    except DeadlineExceeded as e:
+        # anytime behaviour: answer with what the finished stages produced; the run can be resumed later
+        state["status"] = "timed_out"
+        state["error"] = str(e)
+        state["spend"] = budget.spend()
+        await checkpoint_store.save(state)
+        yield _stage_event("deadline", {"reason": str(e), "spend": state["spend"]})
+        yield _stage_event("complete", _collect_notes(_events_in_graph(state["events"], graph)))
+        return
+
+    except Exception as e:
+        # the graph only merges outputs of nodes that succeeded, so the state is safe to resume from
+        state["status"] = "failed"
+        state["error"] = str(e)
+        await checkpoint_store.save(state)
+        raise
+
+    events = _events_in_graph(state["events"], graph)
+    state["status"] = "completed"
+    if budget:
+        state["spend"] = budget.spend()
+    await checkpoint_store.save(state)
+    # a run cut short by its budget is not the full answer for this research_type
+    if not state["skipped_stages"]:
+        await store_result(research_type, state["query"], events, state["run_id"])
+    yield _stage_event("complete", _collect_notes(events))
+
+
+async def main_function(
+    research_type: str,
+    query: Optional[str] = None,
+    run_id: Optional[str] = None,
+    options: Optional[dict] = None,
+):
+    notes = None
+    async for stage in research_events(research_type=research_type, query=query, run_id=run_id, options=options):
+        if stage["event"] == "complete":
+            notes = stage["data"]
+    return notes
+
+
+# Identical (research_type, normalized query) requests in flight at the same time share one run
+research_single_flight = SingleFlight()
+
+
+async def coalesced_main_function(
+    research_type: str,
+    query: str,
+    run_id: str,
+    options: Optional[dict] = None,
+) -> tuple[str, str, list]:
+    """
+    main_function behind single-flight coalescing.
+    Returns (run_id, trace_id, notes) — the run_id is the one of the run that produced
+    the notes, which differs from `run_id` when the request was coalesced onto another
+    run or served from the result cache; coalesced requests share one trace.
+    """
+    async def run():
+        executed_run_id, trace_id, notes = run_id, None, None
+        async for stage in research_events(research_type=research_type, query=query, run_id=run_id, options=options):
+            if stage["event"] == "run":
+                executed_run_id = stage["data"]["run_id"]
+                trace_id = stage["data"]["trace_id"]
+            elif stage["event"] == "complete":
+                notes = stage["data"]
+        return executed_run_id, trace_id, notes
+
+    key = (research_type, normalize_query(query), tuple(sorted((options or {}).items())))
+    return await research_single_flight.do(key, run)
@@ -0,0 +1,83 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db")
+# Seconds a checkpoint is kept after its last save. A live run saves after every stage,
+# so only finished (completed, failed, timed out) or abandoned runs ever get this old.
+CHECKPOINT_RETENTION = float(os.getenv("CHECKPOINT_RETENTION", str(7 * 24 * 3600)))
+
+
+class CheckpointStore:
+    """
+    SQLite store of research run state, saved after every pipeline stage
+    so a run can be resumed (or upgraded to a deeper research_type) later.
+    Checkpoints not saved for `retention` seconds are pruned at startup and on every save.
+    """
+
+    def __init__(self, db_path: str = CHECKPOINT_DB_PATH, retention: float = CHECKPOINT_RETENTION):
+        self.db_path = db_path
+        self.retention = retention
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    run_id     TEXT PRIMARY KEY,
+                    status     TEXT NOT NULL,
+                    state      TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_updated_at ON checkpoints (updated_at)")
+            self._prune(conn)
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        # ISO timestamps in UTC compare correctly as text
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=self.retention)).isoformat()
+        conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (cutoff,))
+
+    def _save(self, run_id: str, status: str, state_json: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, status, state, updated_at) VALUES (?, ?, ?, ?)",
+                (run_id, status, state_json, datetime.now(timezone.utc).isoformat()),
+            )
+            self._prune(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _load(self, run_id: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT state FROM checkpoints WHERE run_id = ?", (run_id,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    async def save(self, state: dict) -> None:
+        state_json = json.dumps(state, default=str)
+        await asyncio.to_thread(self._save, state["run_id"], state["status"], state_json)
+
+    async def load(self, run_id: str) -> Optional[dict]:
+        state_json = await asyncio.to_thread(self._load, run_id)
+        return json.loads(state_json) if state_json is not None else None
+
+
+checkpoint_store = CheckpointStore()
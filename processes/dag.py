@@ -0,0 +1,216 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from helper.tracing import span
+from helper.metrics import STAGE_DURATION
+
+
+class DeadlineExceeded(Exception):
+    """Raised by run_stage_graph when its deadline passes with nodes still pending or running."""
+
+
+class StageNode:
+    """
+    One pipeline stage.
+
+    `fn` receives a dict holding exactly the declared `inputs` and must return a dict
+    holding exactly the declared `outputs`. It must not mutate its inputs — outputs are
+    merged into the run state only once the node succeeds, so a failed attempt leaves
+    the state untouched and can simply be retried.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[dict], Awaitable[dict]],
+        inputs: list[str],
+        outputs: list[str],
+        timeout: Optional[float] = None,
+        retries: int = 0,
+        retry_backoff: float = 1.0,
+        event: Optional[str] = None,
+        event_data: Optional[Callable[[dict], Any]] = None,
+        skip_if: Optional[Callable[[dict], Optional[str]]] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = inputs
+        self.outputs = outputs
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        # name of the event emitted when the node finishes (None = silent node)
+        self.event = event
+        self.event_data = event_data
+        # called with the node's inputs once they are ready; a non-empty return value is
+        # the reason to skip the node, and every node depending on its outputs is skipped too
+        self.skip_if = skip_if
+
+
+class StageGraph:
+    """A set of StageNodes; edges are implied by which node produces each input key."""
+
+    def __init__(self, nodes: list[StageNode], initial_inputs: tuple = ()):
+        self.nodes = nodes
+        self.node_names = [node.name for node in nodes]
+
+        self.producers = producers = {}
+        for node in nodes:
+            for key in node.outputs:
+                if key in producers or key in initial_inputs:
+                    raise ValueError(f"Output '{key}' of '{node.name}' is already produced elsewhere")
+                producers[key] = node.name
+        for node in nodes:
+            for key in node.inputs:
+                if key not in producers and key not in initial_inputs:
+                    raise ValueError(f"Input '{key}' of '{node.name}' is produced by no node")
+
+        # reject cycles up front instead of deadlocking at run time (Kahn's algorithm:
+        # a node is ready once its last missing input is produced)
+        missing = [sum(key not in initial_inputs for key in node.inputs) for node in nodes]
+        consumers: dict[str, list[int]] = {}
+        for index, node in enumerate(nodes):
+            for key in node.inputs:
+                if key not in initial_inputs:
+                    consumers.setdefault(key, []).append(index)
+        ready = [index for index, count in enumerate(missing) if not count]
+        visited = 0
+        while ready:
+            node = nodes[ready.pop()]
+            visited += 1
+            for key in node.outputs:
+                for index in consumers.get(key, ()):
+                    missing[index] -= 1
+                    if not missing[index]:
+                        ready.append(index)
+        if visited < len(nodes):
+            raise ValueError(f"Cycle between nodes {[node.name for node, count in zip(nodes, missing) if count]}")
+
+    def __contains__(self, node_name: str) -> bool:
+        return node_name in self.node_names
+
+
+async def _run_node(node: StageNode, inputs: dict) -> tuple[dict, dict]:
+    """Runs one node inside a `stage.<name>` span. Returns (outputs, timing)."""
+    started = time.perf_counter()
+    status = "failed"
+    try:
+        with span(f"stage.{node.name}", stage=node.name) as stage_span:
+            outputs, timing = await _run_node_attempts(node, inputs)
+            stage_span.set_attributes(attempts=timing["attempts"])
+            status = "completed"
+            return outputs, timing
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, stage=node.name, status=status)
+
+
+async def _run_node_attempts(node: StageNode, inputs: dict) -> tuple[dict, dict]:
+    """Runs one node with its timeout and retry policy. Returns (outputs, timing)."""
+    started_at = time.time()
+    attempt = 0
+    while True:
+        attempt += 1
+        attempt_started = time.perf_counter()
+        try:
+            outputs = await asyncio.wait_for(node.fn(inputs), timeout=node.timeout)
+            missing = [key for key in node.outputs if key not in (outputs or {})]
+            if missing:
+                raise ValueError(f"Node '{node.name}' did not return outputs {missing}")
+            timing = {
+                "started_at": started_at,
+                "duration_s": round(time.time() - started_at, 3),
+                "last_attempt_s": round(time.perf_counter() - attempt_started, 3),
+                "attempts": attempt,
+            }
+            return {key: outputs[key] for key in node.outputs}, timing
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"Node '{node.name}' timed out after {node.timeout}s")
+            if attempt > node.retries:
+                raise e
+            delay = node.retry_backoff * (2 ** (attempt - 1))
+            print(f"⚠️ Node '{node.name}' attempt {attempt} failed: {e} — retrying in {delay}s")
+            await asyncio.sleep(delay)
+
+
+async def run_stage_graph(
+    graph: StageGraph,
+    values: dict,
+    completed: list[str],
+    skipped: Optional[list[str]] = None,
+    deadline_at: Optional[float] = None,
+) -> AsyncIterator[tuple[StageNode, Optional[dict], dict]]:
+    """
+    Executes every node of `graph` not listed in `completed` or `skipped`, starting each one
+    as soon as all its inputs are present in `values` — independent nodes run concurrently.
+
+    Yields (node, outputs, timing) as nodes finish; the outputs are already merged into
+    `values` and the node name appended to `completed`, so the caller can checkpoint
+    between yields. Skipped nodes are appended to `skipped` and yielded with outputs None
+    and timing {"skipped": <reason>}. On the first node failure the other running nodes
+    are cancelled and the error is raised.
+
+    `deadline_at` is a time.monotonic() timestamp: once it passes, the running nodes are
+    cancelled and DeadlineExceeded is raised; everything yielded so far stays merged.
+    """
+    skipped = skipped if skipped is not None else []
+    pending = [node for node in graph.nodes if node.name not in completed and node.name not in skipped]
+    running: dict[asyncio.Task, StageNode] = {}
+
+    try:
+        while pending or running:
+            # a skip can make further nodes skippable, so keep scanning until nothing changes
+            changed = True
+            while changed:
+                changed = False
+                for node in list(pending):
+                    skipped_inputs = [key for key in node.inputs if graph.producers.get(key) in skipped]
+                    if skipped_inputs:
+                        reason = f"inputs {skipped_inputs} were skipped"
+                    elif all(key in values for key in node.inputs):
+                        inputs = {key: values[key] for key in node.inputs}
+                        reason = node.skip_if(inputs) if node.skip_if else None
+                        if not reason:
+                            pending.remove(node)
+                            running[asyncio.create_task(_run_node(node, inputs))] = node
+                            continue
+                    else:
+                        continue
+
+                    pending.remove(node)
+                    skipped.append(node.name)
+                    changed = True
+                    print(f"⏭️ Node '{node.name}' skipped: {reason}")
+                    yield node, None, {"skipped": reason}
+
+            if not running:
+                if pending:
+                    raise RuntimeError(f"Nodes {[node.name for node in pending]} can never become ready")
+                break
+
+            timeout = max(0.0, deadline_at - time.monotonic()) if deadline_at is not None else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Deadline reached while {[node.name for node in running.values()]} were running")
+            for task in done:
+                node = running.pop(task)
+                try:
+                    outputs, timing = task.result()
+                except Exception as e:
+                    raise RuntimeError(f"{node.name}: {e}") from e
+                values.update(outputs)
+                completed.append(node.name)
+                print(f"⏱️ Node '{node.name}' finished in {timing['duration_s']}s ({timing['attempts']} attempt(s))")
+                yield node, outputs, timing
+
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,325 @@
+from dotenv import load_dotenv
+load_dotenv()
+import os
+import time
+from functools import lru_cache
+from typing import Optional
+from prompts.intent_prompt_file import intent_prompt
+from processes.step0 import step0_function
+from processes.shallow_prompt import shallow_research_prompt
+from processes.intermidiate_prompt import intermediate_research_prompt
+from processes.deep_reasearch_prompt import deep_research_prompt
+from processes.search_round import search_round_function, SEARCH_CONCURRENCY
+from processes.dag import StageNode, StageGraph
+from helper.websearch_filter import update_completed_topics
+from helper.run_budget import current_run_budget
+from tools.tavily import SEARCH_PROFILES, ROUND_SEARCH_PROFILE
+from tools.tavily_scheduler import search_priority, PRIORITY_STEP0, PRIORITY_FIRST_ROUND, PRIORITY_NORMAL
+
+
+# Per-node timeout (seconds) and retry policy
+LLM_STAGE_TIMEOUT = float(os.getenv("LLM_STAGE_TIMEOUT", "180"))
+LLM_STAGE_RETRIES = int(os.getenv("LLM_STAGE_RETRIES", "1"))
+STEP0_STAGE_TIMEOUT = float(os.getenv("STEP0_STAGE_TIMEOUT", "240"))
+SEARCH_STAGE_TIMEOUT = float(os.getenv("SEARCH_STAGE_TIMEOUT", "120"))
+SEARCH_STAGE_RETRIES = int(os.getenv("SEARCH_STAGE_RETRIES", "0"))
+
+# Adaptive mode: analyze → search → analyze until coverage is reached or a budget runs out
+ADAPTIVE_MAX_ROUNDS = int(os.getenv("ADAPTIVE_MAX_ROUNDS", "4"))
+# Most rounds a request may ask for: the unrolled graph is built before the first round runs
+ADAPTIVE_MAX_ROUNDS_LIMIT = int(os.getenv("ADAPTIVE_MAX_ROUNDS_LIMIT", "12"))
+ADAPTIVE_TIME_BUDGET = float(os.getenv("ADAPTIVE_TIME_BUDGET", "150"))
+ADAPTIVE_MAX_SEARCHES = int(os.getenv("ADAPTIVE_MAX_SEARCHES", "15"))
+# "primary" stops once primary_status is FULFILLED, "both" also waits for secondary_status
+ADAPTIVE_STOP_ON = os.getenv("ADAPTIVE_STOP_ON", "primary")
+
+# Analysis round kinds; a round's event name is its kind
+ANALYSIS_KINDS = ("shallow", "intermediate", "deep")
+
+# Search queries an analysis round asks for when the run has no budget
+DEFAULT_NUM_QUERIES = {"shallow": 2, "intermediate": 5}
+
+# Inputs every run provides before the first node starts
+INITIAL_INPUTS = ("query", "run_started_at", "research_options")
+
+
+# ─────────────────────────────────────────────
+# NODE FUNCTIONS — take a dict of inputs, return a dict of outputs
+# ─────────────────────────────────────────────
+
+async def intent_node(inputs: dict) -> dict:
+    user_intent = await intent_prompt(inputs["query"])
+    print("user_intent: ", user_intent)
+    if not user_intent or "error" in user_intent:
+        raise ValueError(f"intent_prompt failed: {user_intent}")
+    return {"user_intent": user_intent}
+
+
+async def step0_node(inputs: dict) -> dict:
+    # node tasks run in their own context, so this only affects step0's searches
+    search_priority.set(PRIORITY_STEP0)
+    #  research_documantation
+    research = {
+        "user_intent": inputs["user_intent"],
+        "used_queries": [],
+        "research_data": [],
+        "DeepResearch": [],
+    }
+    research = await step0_function(research)
+    print("research step0:  ", research)
+    return {
+        "research_data": research["research_data"],
+        "used_queries_step0": research["used_queries"],
+    }
+
+
+def _research_view(inputs: dict, used_query_keys: list[str]) -> dict:
+    """The `research` dict the prompt builders expect, assembled from node inputs."""
+    return {
+        "user_intent": inputs["user_intent"],
+        "used_queries": [query for key in used_query_keys for query in inputs[key]],
+        "research_data": inputs["research_data"],
+    }
+
+
+def _planned_num_queries(kind: str) -> int:
+    """Queries the next round should ask for, shrunk to what the run's budget can still search."""
+    default = DEFAULT_NUM_QUERIES[kind]
+    budget = current_run_budget.get()
+    if budget is None:
+        return default
+    # at least one: the following search node is skipped if even that does not fit
+    return max(1, budget.plan_num_queries(default, SEARCH_CONCURRENCY))
+
+
+async def _analysis_outputs(kind: str, analysis: dict, previous: dict) -> dict:
+    if not analysis or "error" in analysis:
+        raise ValueError(f"{kind} analysis failed: {analysis}")
+
+    notes = analysis.get("notes") or []
+    completed_topics = await update_completed_topics(list(previous.get("completed_topics", [])), notes)
+    search_queries = analysis.get("search_queries") or []
+    print("search_queries:  ", search_queries)
+    return {
+        "notes": notes,
+        "search_queries": search_queries,
+        "primary_status": analysis.get("primary_status"),
+        "secondary_status": analysis.get("secondary_status"),
+        "remaining_primary_research_purpose": analysis.get("remaining_primary_research_purpose",[]),
+        "remaining_secondary_research_purpose": analysis.get("remaining_primary_research_purpose",[]),
+        "completed_topics": completed_topics,
+    }
+
+
+def _analysis_node(kind: str, name: str, round_number: int, used_query_keys: list[str]) -> StageNode:
+    output_key = f"analysis_{round_number}"
+    previous_key = f"analysis_{round_number - 1}"
+    search_key = f"search_data_{round_number}"
+
+    async def run(inputs: dict) -> dict:
+        research = _research_view(inputs, used_query_keys)
+        previous = inputs.get(previous_key, {})
+
+        if kind == "shallow":
+            analysis = await shallow_research_prompt(research=research, num_queries=_planned_num_queries(kind))
+            print("shallow_reasearch:   ", analysis)
+        elif kind == "intermediate":
+            analysis = await intermediate_research_prompt(
+                research,
+                inputs[search_key],
+                previous["remaining_primary_research_purpose"],
+                previous["remaining_secondary_research_purpose"],
+                previous["completed_topics"],
+                num_queries=_planned_num_queries(kind),
+            )
+        else:
+            analysis = await deep_research_prompt(
+                research,
+                inputs[search_key],
+                previous["remaining_primary_research_purpose"],
+                previous["remaining_secondary_research_purpose"],
+                previous["completed_topics"],
+            )
+
+        return {output_key: await _analysis_outputs(kind, analysis, previous)}
+
+    inputs = ["user_intent", "research_data", *used_query_keys]
+    if round_number > 1:
+        inputs += [previous_key, search_key]
+
+    return StageNode(
+        name=name,
+        fn=run,
+        inputs=inputs,
+        outputs=[output_key],
+        timeout=LLM_STAGE_TIMEOUT,
+        retries=LLM_STAGE_RETRIES,
+        event=kind,
+        event_data=lambda outputs: outputs[output_key]["notes"],
+    )
+
+
+def _adaptive_stop_reason(inputs: dict, previous_key: str, used_query_keys: list[str]) -> Optional[str]:
+    """Why an adaptive run should not search for another round, or None to keep going."""
+    previous = inputs[previous_key]
+    options = inputs["research_options"]
+
+    primary_done = previous.get("primary_status") == "FULFILLED"
+    secondary_done = previous.get("secondary_status") == "FULFILLED"
+    if primary_done and (ADAPTIVE_STOP_ON == "primary" or secondary_done):
+        return "coverage FULFILLED"
+
+    search_queries = previous.get("search_queries") or []
+    if not search_queries:
+        return "no search queries left"
+
+    time_budget = options.get("time_budget_s", ADAPTIVE_TIME_BUDGET)
+    elapsed = time.time() - inputs["run_started_at"]
+    if elapsed >= time_budget:
+        return f"time budget spent ({elapsed:.0f}s of {time_budget:.0f}s)"
+
+    max_searches = options.get("max_searches", ADAPTIVE_MAX_SEARCHES)
+    used_searches = sum(len(inputs[key]) for key in used_query_keys)
+    if used_searches + len(search_queries) > max_searches:
+        return f"search budget spent ({used_searches} used, {len(search_queries)} more would exceed {max_searches})"
+
+    return None
+
+
+def _budget_stop_reason(search_queries: list) -> Optional[str]:
+    """Why the run's deadline / spend budget leaves no room for another search round, or None."""
+    budget = current_run_budget.get()
+    if budget is None:
+        return None
+    reason = budget.exhausted_reason()
+    if reason:
+        return reason
+    num_queries, _ = budget.plan_search(len(search_queries), SEARCH_CONCURRENCY)
+    if search_queries and num_queries == 0:
+        return "no budget left for another search round"
+    return None
+
+
+def _search_node(round_number: int, adaptive_used_query_keys: Optional[list[str]] = None) -> StageNode:
+    """Query expansion + search + filtering for the previous round's queries.
+    The node is skipped once the run's budget is spent and, with `adaptive_used_query_keys`,
+    once the adaptive stop condition holds.
+    Searches use ROUND_SEARCH_PROFILE; under a budget the queries that do not fit are
+    dropped and the basic profile is used when advanced depth would not fit."""
+    previous_key = f"analysis_{round_number - 1}"
+    data_key = f"search_data_{round_number}"
+    used_key = f"used_queries_{round_number}"
+
+    async def run(inputs: dict) -> dict:
+        search_priority.set(PRIORITY_FIRST_ROUND if round_number == 2 else PRIORITY_NORMAL)
+        search_queries = inputs[previous_key]["search_queries"]
+        profile = ROUND_SEARCH_PROFILE
+        budget = current_run_budget.get()
+        if budget is not None:
+            num_queries, search_depth = budget.plan_search(len(search_queries), SEARCH_CONCURRENCY)
+            search_queries = search_queries[:num_queries]
+            if search_depth != SEARCH_PROFILES[profile]["search_depth"]:
+                profile = "basic"
+
+        research = {"used_queries": []}
+        data = await search_round_function(search_queries, research, profile=profile)
+        return {data_key: data, used_key: research["used_queries"]}
+
+    def skip_if(node_inputs: dict) -> Optional[str]:
+        if adaptive_used_query_keys is not None:
+            reason = _adaptive_stop_reason(node_inputs, previous_key, adaptive_used_query_keys)
+            if reason:
+                return reason
+        return _budget_stop_reason(node_inputs[previous_key]["search_queries"])
+
+    inputs = [previous_key]
+    if adaptive_used_query_keys is not None:
+        inputs += [*adaptive_used_query_keys, "run_started_at", "research_options"]
+
+    return StageNode(
+        name=f"search_{round_number}",
+        fn=run,
+        inputs=inputs,
+        outputs=[data_key, used_key],
+        timeout=SEARCH_STAGE_TIMEOUT,
+        retries=SEARCH_STAGE_RETRIES,
+        skip_if=skip_if,
+    )
+
+
+# ─────────────────────────────────────────────
+# GRAPHS
+# ─────────────────────────────────────────────
+
+def build_research_graph(rounds: list[str], adaptive: bool = False) -> StageGraph:
+    """
+    intent → step0 → one analysis node per entry of `rounds`, with a search node
+    (query expansion + Tavily + filtering for the previous round's queries) before
+    every round after the first.
+    `rounds` must start with "shallow"; "deep" produces no queries so it can only be last.
+    With `adaptive`, each search node is skipped — and with it every later round — once
+    the previous round reports FULFILLED coverage or the run's time/search budget is spent.
+    """
+    if not rounds or rounds[0] != "shallow" or "shallow" in rounds[1:]:
+        raise ValueError(f"Research rounds must start with a single 'shallow' round: {rounds}")
+    if "deep" in rounds[:-1]:
+        raise ValueError(f"A 'deep' round can only be the last one: {rounds}")
+    if any(kind not in ANALYSIS_KINDS for kind in rounds):
+        raise ValueError(f"Unknown round kind in {rounds}, expected {ANALYSIS_KINDS}")
+
+    nodes = [
+        StageNode(
+            name="intent",
+            fn=intent_node,
+            inputs=["query"],
+            outputs=["user_intent"],
+            timeout=LLM_STAGE_TIMEOUT,
+            retries=LLM_STAGE_RETRIES,
+            event="intent",
+            event_data=lambda outputs: outputs["user_intent"],
+        ),
+        StageNode(
+            name="step0",
+            fn=step0_node,
+            inputs=["user_intent"],
+            outputs=["research_data", "used_queries_step0"],
+            timeout=STEP0_STAGE_TIMEOUT,
+            event="step0",
+            event_data=lambda outputs: outputs["research_data"],
+        ),
+    ]
+
+    used_query_keys = ["used_queries_step0"]
+    seen_kinds = set()
+    for round_number, kind in enumerate(rounds, start=1):
+        if round_number > 1:
+            nodes.append(_search_node(round_number, used_query_keys if adaptive else None))
+            used_query_keys = used_query_keys + [f"used_queries_{round_number}"]
+        name = kind if kind not in seen_kinds else f"{kind}_{round_number}"
+        seen_kinds.add(kind)
+        nodes.append(_analysis_node(kind, name, round_number, used_query_keys))
+
+    return StageGraph(nodes, initial_inputs=INITIAL_INPUTS)
+
+
+RESEARCH_GRAPHS = {
+    "Shallow": build_research_graph(["shallow"]),
+    "Intermediate": build_research_graph(["shallow", "intermediate"]),
+    "Deep": build_research_graph(["shallow", "intermediate", "deep"]),
+}
+
+
+@lru_cache(maxsize=16)
+def build_adaptive_graph(max_rounds: int) -> StageGraph:
+    """Up to `max_rounds` rounds: shallow, intermediate rounds while gaps remain, and a final deep round."""
+    if max_rounds <= 1:
+        return build_research_graph(["shallow"], adaptive=True)
+    rounds = ["shallow"] + ["intermediate"] * (max_rounds - 2) + ["deep"]
+    return build_research_graph(rounds, adaptive=True)
+
+
+def get_research_graph(research_type: str, options: dict) -> StageGraph:
+    if research_type == "Adaptive":
+        max_rounds = int(options.get("max_rounds", ADAPTIVE_MAX_ROUNDS))
+        return build_adaptive_graph(min(max_rounds, ADAPTIVE_MAX_ROUNDS_LIMIT))
+    return RESEARCH_GRAPHS[research_type]
@@ -0,0 +1,52 @@
+from dotenv import load_dotenv
+load_dotenv()
+import os
+from typing import Optional
+from helper.tiered_cache import TieredCache
+from helper.single_flight import normalize_query
+
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+RESULT_CACHE_DB_PATH = os.getenv("RESULT_CACHE_DB_PATH", "result_cache.db")
+
+# A deeper run's stage events contain every stage a shallower one would run.
+# Adaptive runs stop at a data-dependent round, so they are neither cached nor served.
+RESEARCH_DEPTH = {"Shallow": 1, "Intermediate": 2, "Deep": 3}
+
+
+result_cache = TieredCache(
+    name="research_results",
+    ttl=RESULT_CACHE_TTL,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    db_path=RESULT_CACHE_DB_PATH,
+    disk_max_bytes=RESULT_CACHE_DISK_MAX_BYTES,
+)
+
+
+async def get_cached_result(research_type: str, query: str) -> Optional[dict]:
+    """
+    Returns {"research_type", "events", "run_id"} of a cached run at least as deep as `research_type`.
+    Entries are keyed on the normalized query only, so one Deep entry serves all three types.
+    """
+    if research_type not in RESEARCH_DEPTH:
+        return None
+    entry = await result_cache.get(normalize_query(query))
+    if entry is None or RESEARCH_DEPTH[entry["research_type"]] < RESEARCH_DEPTH[research_type]:
+        return None
+    return entry
+
+
+async def store_result(research_type: str, query: str, events: list, run_id: str) -> None:
+    """
+    Caches the stage events of a completed run unless a deeper run is already cached.
+    The run_id is kept so a cache hit can point at the source run's checkpoint (e.g. to upgrade it).
+    """
+    if research_type not in RESEARCH_DEPTH:
+        return
+    key = normalize_query(query)
+    existing = await result_cache.get(key, record_stats=False)
+    if existing is not None and RESEARCH_DEPTH[existing["research_type"]] > RESEARCH_DEPTH[research_type]:
+        return
+    await result_cache.set(key, {"research_type": research_type, "events": events, "run_id": run_id})
@@ -0,0 +1,60 @@
+from dotenv import load_dotenv
+load_dotenv()
+import os
+from tools.tavily import tavily_web_search_many, ROUND_SEARCH_PROFILE
+from helper.query_creator import query_creator_function
+from helper.websearch_filter import filter_results
+from helper.single_flight import normalize_query
+
+
+# Max number of searches of one round that may be in flight at the same time
+SEARCH_CONCURRENCY = max(1, int(os.getenv("SEARCH_CONCURRENCY", "5")))
+
+
+async def search_round_function(
+    search_queries: list,
+    research: dict,
+    concurrency: int = SEARCH_CONCURRENCY,
+    profile: str = ROUND_SEARCH_PROFILE,
+) -> list[dict]:
+    """
+    Runs query_creator → tavily → filter for every query of a round, with the searches
+    batched through tavily_web_search_many at most `concurrency` at a time, using the
+    `profile` search settings.
+    Results and research["used_queries"] keep the order of `search_queries`;
+    a failed query is logged and skipped so the rest of the round still returns.
+    Queries that build the same search are searched once and their results kept once.
+    """
+    if not search_queries:
+        return []
+
+    built = []
+    for single_query in search_queries:
+        try:
+            built.append((single_query, await query_creator_function(single_query)))
+        except Exception as e:
+            print(f"❌ Could not build a search for query '{single_query}': {e}")
+
+    if not built:
+        return []
+    responses = await tavily_web_search_many([query for _, query in built], profile=profile, concurrency=concurrency)
+
+    round_research_data = []
+    searched = set()
+    for (single_query, query), data in zip(built, responses):
+        if "error" in data:
+            print(f"❌ Search failed for query '{single_query}': {data['error']}")
+            continue
+        research["used_queries"].append(single_query)
+        if normalize_query(query) in searched:
+            continue
+        searched.add(normalize_query(query))
+        try:
+            filtered_data = await filter_results(data=data, keyword=single_query["name"])
+        except Exception as e:
+            print(f"❌ Filtering failed for query '{single_query}': {e}")
+            continue
+        print("filtered_data:   ", filtered_data)
+        round_research_data.extend(filtered_data)
+
+    return round_research_data
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Every SQLite store gets a throwaway path before any module reads its settings
+_DB_DIR = tempfile.mkdtemp(prefix="research-tests-")
+for setting in ("JOB_DB_PATH", "ENTITY_CACHE_DB_PATH", "CHECKPOINT_DB_PATH", "RESULT_CACHE_DB_PATH", "SEARCH_CACHE_DB_PATH"):
+    os.environ[setting] = os.path.join(_DB_DIR, setting.lower() + ".db")
+
+
+def _unavailable(what: str):
+    def call(*args, **kwargs):
+        raise RuntimeError(f"{what} is not available in tests")
+    return call
+
+
+# The MPNet stack (sentence-transformers, torch, scikit-learn) and the Bedrock client are
+# not needed by these tests: nothing here embeds text or calls an LLM for real. Without
+# them installed, stand in for the modules that import them.
+try:
+    import helper.mpnet_keyword_extractor  # noqa: F401
+except ImportError:
+    _mpnet = types.ModuleType("helper.mpnet_keyword_extractor")
+    _mpnet._get_model = _unavailable("the MPNet model")
+    _mpnet.MPNetExtractor = _unavailable("the MPNet extractor")
+    sys.modules["helper.mpnet_keyword_extractor"] = _mpnet
+
+try:
+    import llm.hiaku  # noqa: F401
+except ImportError:
+    _hiaku = types.ModuleType("llm.hiaku")
+    _hiaku.claude_haiku = _unavailable("Bedrock")
+    sys.modules["llm.hiaku"] = _hiaku
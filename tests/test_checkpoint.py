@@ -0,0 +1,54 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from processes.checkpoint import CheckpointStore
+
+
+def backdate(db_path, run_id: str, seconds: float) -> None:
+    updated_at = (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE checkpoints SET updated_at = ? WHERE run_id = ?", (updated_at, run_id))
+    conn.commit()
+    conn.close()
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = CheckpointStore(db_path=str(tmp_path / "checkpoints.db"))
+    state = {"run_id": "run-1", "status": "running", "completed_stages": ["intent"], "values": {"query": "q"}}
+
+    async def scenario():
+        await store.save(state)
+        return await store.load("run-1"), await store.load("missing")
+
+    loaded, missing = asyncio.run(scenario())
+    assert loaded == state
+    assert missing is None
+
+
+def test_old_checkpoints_are_pruned_on_save(tmp_path):
+    db_path = str(tmp_path / "checkpoints.db")
+    store = CheckpointStore(db_path=db_path, retention=3600)
+
+    async def scenario():
+        await store.save({"run_id": "old", "status": "completed"})
+        await store.save({"run_id": "recent", "status": "failed"})
+        backdate(db_path, "old", 7200)
+        backdate(db_path, "recent", 60)
+        await store.save({"run_id": "new", "status": "running"})
+        return [await store.load(run_id) for run_id in ("old", "recent", "new")]
+
+    old, recent, new = asyncio.run(scenario())
+    assert old is None
+    assert recent is not None and new is not None
+
+
+def test_old_checkpoints_are_pruned_at_startup(tmp_path):
+    db_path = str(tmp_path / "checkpoints.db")
+
+    async def scenario():
+        await CheckpointStore(db_path=db_path).save({"run_id": "old", "status": "timed_out"})
+        backdate(db_path, "old", 7200)
+        return await CheckpointStore(db_path=db_path, retention=3600).load("old")
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+import pytest
+
+from processes.dag import DeadlineExceeded, StageGraph, StageNode, run_stage_graph
+
+
+def node(name, inputs, outputs, fn=None, **kwargs) -> StageNode:
+    async def default(node_inputs):
+        return {key: f"{name}:{key}" for key in outputs}
+    return StageNode(name, fn or default, inputs, outputs, **kwargs)
+
+
+async def collect(graph, values, completed=None, skipped=None, deadline_at=None):
+    completed = completed if completed is not None else []
+    skipped = skipped if skipped is not None else []
+    finished = []
+    async for stage, outputs, timing in run_stage_graph(graph, values, completed, skipped, deadline_at=deadline_at):
+        finished.append((stage.name, outputs, timing))
+    return finished
+
+
+def test_graph_validation():
+    with pytest.raises(ValueError, match="already produced"):
+        StageGraph([node("a", [], ["x"]), node("b", [], ["x"])])
+    with pytest.raises(ValueError, match="produced by no node"):
+        StageGraph([node("a", ["missing"], ["x"])])
+    with pytest.raises(ValueError, match="Cycle"):
+        StageGraph([node("a", ["y"], ["x"]), node("b", ["x"], ["y"])])
+
+
+def test_large_graph_is_validated_in_linear_time():
+    chain = [node(f"n{i}", [f"k{i - 1}"] if i else [], [f"k{i}"]) for i in range(20000)]
+    started = time.perf_counter()
+    StageGraph(chain)
+    assert time.perf_counter() - started < 1
+    with pytest.raises(ValueError, match=r"Cycle between nodes \['a', 'b'\]"):
+        StageGraph([node("a", ["y"], ["x"]), node("b", ["x"], ["y"]), node("c", [], ["z"])])
+
+
+def test_adaptive_rounds_are_capped():
+    from processes.research_graph import ADAPTIVE_MAX_ROUNDS_LIMIT, build_adaptive_graph, get_research_graph
+    assert get_research_graph("Adaptive", {"max_rounds": 10 ** 6}) is build_adaptive_graph(ADAPTIVE_MAX_ROUNDS_LIMIT)
+
+
+def test_independent_nodes_run_concurrently():
+    async def left(inputs):
+        await asyncio.sleep(0.1)
+        return {"left": 1}
+
+    async def right(inputs):
+        await asyncio.sleep(0.1)
+        return {"right": 2}
+
+    async def join(inputs):
+        return {"sum": inputs["left"] + inputs["right"]}
+
+    graph = StageGraph(
+        [node("left", ["start"], ["left"], left), node("right", ["start"], ["right"], right),
+         node("join", ["left", "right"], ["sum"], join)],
+        initial_inputs=("start",),
+    )
+    values = {"start": True}
+    started = time.perf_counter()
+    finished = asyncio.run(collect(graph, values))
+    assert time.perf_counter() - started < 0.19
+    assert [name for name, _, _ in finished][-1] == "join"
+    assert values["sum"] == 3
+
+
+def test_completed_nodes_are_not_rerun():
+    calls = []
+
+    async def second(inputs):
+        calls.append(inputs["x"])
+        return {"y": inputs["x"] + 1}
+
+    graph = StageGraph([node("first", [], ["x"]), node("second", ["x"], ["y"], second)])
+    values = {"x": 41}
+    completed = ["first"]
+    finished = asyncio.run(collect(graph, values, completed))
+    assert [name for name, _, _ in finished] == ["second"]
+    assert calls == [41]
+    assert completed == ["first", "second"]
+
+
+def test_skip_propagates_to_dependents():
+    graph = StageGraph([
+        node("a", [], ["x"]),
+        node("b", ["x"], ["y"], skip_if=lambda inputs: "not needed"),
+        node("c", ["y"], ["z"]),
+        node("d", ["x"], ["w"]),
+    ])
+    skipped = []
+    finished = asyncio.run(collect(graph, {}, skipped=skipped))
+    timings = {name: timing for name, _, timing in finished}
+    assert skipped == ["b", "c"]
+    assert timings["b"] == {"skipped": "not needed"}
+    assert timings["c"] == {"skipped": "inputs ['y'] were skipped"}
+    assert "d" in timings and "skipped" not in timings["d"]
+
+
+def test_retries_then_succeeds():
+    attempts = []
+
+    async def flaky(inputs):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("transient")
+        return {"x": "ok"}
+
+    graph = StageGraph([node("flaky", [], ["x"], flaky, retries=2, retry_backoff=0.01)])
+    finished = asyncio.run(collect(graph, {}))
+    assert finished[0][2]["attempts"] == 3
+
+
+def test_failure_cancels_running_nodes_and_keeps_state():
+    cancelled = []
+
+    async def fails(inputs):
+        raise RuntimeError("broken")
+
+    async def slow(inputs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+        return {"y": 1}
+
+    graph = StageGraph([node("fails", [], ["x"], fails), node("slow", [], ["y"], slow)])
+    values = {}
+    with pytest.raises(RuntimeError, match="fails: broken"):
+        asyncio.run(collect(graph, values))
+    assert cancelled == ["slow"]
+    assert values == {}
+
+
+def test_node_timeout_and_missing_outputs():
+    async def hangs(inputs):
+        await asyncio.sleep(5)
+
+    async def incomplete(inputs):
+        return {}
+
+    with pytest.raises(RuntimeError, match="timed out"):
+        asyncio.run(collect(StageGraph([node("hangs", [], ["x"], hangs, timeout=0.05)]), {}))
+    with pytest.raises(RuntimeError, match="did not return outputs"):
+        asyncio.run(collect(StageGraph([node("incomplete", [], ["x"], incomplete)]), {}))
+
+
+def test_deadline_keeps_finished_nodes():
+    async def slow(inputs):
+        await asyncio.sleep(5)
+        return {"y": 1}
+
+    graph = StageGraph([node("fast", [], ["x"]), node("slow", ["x"], ["y"], slow)])
+    values, completed = {}, []
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(collect(graph, values, completed, deadline_at=time.monotonic() + 0.1))
+    assert completed == ["fast"]
+    assert values == {"x": "fast:x"}
@@ -0,0 +1,220 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+import api.entity_cache as entity_cache
+from api import person_details, person_post
+from api.entity_cache import EntityRefresher, FOUND, NOT_FOUND, lookup_entity
+from api.linkedin_client import LinkedInResponse
+from helper.run_budget import RunBudget, current_run_budget
+from helper.tiered_cache import TieredCache
+
+
+class Upstream:
+    """A fetch that answers from a script of (value, outcome) or exceptions and counts its calls."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        answer = self.answers[min(self.calls, len(self.answers)) - 1]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture(autouse=True)
+def refresher(monkeypatch):
+    refresher = EntityRefresher(concurrency=2)
+    monkeypatch.setattr(entity_cache, "entity_refresher", refresher)
+    return refresher
+
+
+def make_cache(tmp_path, ttl=60.0, stale_ttl=60.0) -> TieredCache:
+    return TieredCache("entities", ttl=ttl, max_bytes=1 << 20, db_path=str(tmp_path / "entities.db"), stale_ttl=stale_ttl)
+
+
+async def settle(refresher: EntityRefresher) -> None:
+    while refresher._in_flight:
+        await asyncio.gather(*refresher._in_flight.values())
+
+
+def test_found_is_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    upstream = Upstream(({"name": "Ada"}, FOUND))
+
+    async def scenario():
+        return [await lookup_entity(cache, "person:ada", upstream) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [{"name": "Ada"}] * 3
+    assert upstream.calls == 1
+
+
+def test_transient_failure_is_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    upstream = Upstream(({"error": "timeout"}, None), ({"name": "Ada"}, FOUND))
+
+    async def scenario():
+        return await lookup_entity(cache, "person:ada", upstream), await lookup_entity(cache, "person:ada", upstream)
+
+    assert asyncio.run(scenario()) == ({"error": "timeout"}, {"name": "Ada"})
+    assert upstream.calls == 2
+
+
+def test_not_found_is_cached_until_negative_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(entity_cache, "ENTITY_NEGATIVE_TTL", 0.1)
+    cache = make_cache(tmp_path)
+    upstream = Upstream((None, NOT_FOUND), ({"name": "Ada"}, FOUND))
+
+    async def scenario():
+        first = await lookup_entity(cache, "person:ada", upstream)
+        second = await lookup_entity(cache, "person:ada", upstream, allow_stale=True)
+        await asyncio.sleep(0.15)
+        # an expired not-found entry is a miss, even when stale entries are allowed
+        third = await lookup_entity(cache, "person:ada", upstream, allow_stale=True)
+        return first, second, third
+
+    assert asyncio.run(scenario()) == (None, None, {"name": "Ada"})
+    assert upstream.calls == 2
+
+
+def test_stale_found_is_served_and_refreshed_in_background(tmp_path, refresher):
+    cache = make_cache(tmp_path, ttl=0.1)
+    upstream = Upstream(({"v": 1}, FOUND), ({"v": 2}, FOUND))
+
+    async def scenario():
+        await lookup_entity(cache, "person:ada", upstream)
+        await asyncio.sleep(0.15)
+        stale = await lookup_entity(cache, "person:ada", upstream, allow_stale=True)
+        await settle(refresher)
+        refreshed = await lookup_entity(cache, "person:ada", upstream, allow_stale=True)
+        return stale, refreshed
+
+    assert asyncio.run(scenario()) == ({"v": 1}, {"v": 2})
+    assert refresher.stats() == {"in_flight": 0, "refreshed": 1, "failed": 0}
+
+
+def test_expired_entry_is_fetched_inline_without_allow_stale(tmp_path):
+    cache = make_cache(tmp_path, ttl=0.1)
+    upstream = Upstream(({"v": 1}, FOUND), ({"v": 2}, FOUND))
+
+    async def scenario():
+        await lookup_entity(cache, "person:ada", upstream)
+        await asyncio.sleep(0.15)
+        return await lookup_entity(cache, "person:ada", upstream)
+
+    assert asyncio.run(scenario()) == {"v": 2}
+
+
+@pytest.mark.parametrize("failure", [RuntimeError("upstream down"), ({"error": "HTTP 503"}, None)])
+def test_failed_refresh_keeps_stale_entry(tmp_path, refresher, failure):
+    cache = make_cache(tmp_path, ttl=0.1)
+    upstream = Upstream(({"v": 1}, FOUND), failure)
+
+    async def scenario():
+        await lookup_entity(cache, "person:ada", upstream)
+        await asyncio.sleep(0.15)
+        first = await lookup_entity(cache, "person:ada", upstream, allow_stale=True)
+        await settle(refresher)
+        second = await lookup_entity(cache, "person:ada", upstream, allow_stale=True)
+        await settle(refresher)
+        return first, second
+
+    assert asyncio.run(scenario()) == ({"v": 1}, {"v": 1})
+    assert refresher.failed == 2
+
+
+def test_one_refresh_per_key(tmp_path, refresher):
+    cache = make_cache(tmp_path, ttl=0.1)
+    started = time.monotonic()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {"v": time.monotonic() - started}, FOUND
+
+    async def scenario():
+        await cache.set("person:ada", {"value": {"v": 0}, "expires_at": None})
+        await asyncio.sleep(0.15)
+        await asyncio.gather(*[lookup_entity(cache, "person:ada", slow, allow_stale=True) for _ in range(5)])
+        in_flight = len(refresher._in_flight)
+        await settle(refresher)
+        return in_flight
+
+    assert asyncio.run(scenario()) == 1
+    assert refresher.refreshed == 1
+
+
+def test_refresh_does_not_inherit_request_context(tmp_path, refresher):
+    cache = make_cache(tmp_path, ttl=0.1)
+    seen = []
+
+    async def fetch():
+        seen.append(current_run_budget.get())
+        return {"v": 2}, FOUND
+
+    async def scenario():
+        await cache.set("person:ada", {"value": {"v": 1}, "expires_at": None})
+        await asyncio.sleep(0.15)
+        current_run_budget.set(RunBudget(deadline_s=0.01))
+        await lookup_entity(cache, "person:ada", fetch, allow_stale=True)
+        await settle(refresher)
+
+    asyncio.run(scenario())
+    assert seen == [None]
+
+
+@pytest.mark.parametrize("status_code, has_entity, outcome", [
+    (200, True, FOUND),
+    (200, False, NOT_FOUND),
+    (404, True, NOT_FOUND),
+    (500, True, None),
+    (429, True, None),
+    (None, True, None),
+    ("timeout", True, None),
+])
+def test_lookup_outcome(status_code, has_entity, outcome):
+    assert entity_cache.lookup_outcome(status_code, has_entity) == outcome
+
+
+def test_user_without_provider_id_is_cached_as_not_found(monkeypatch):
+    calls = []
+
+    async def get(url, endpoint):
+        calls.append(endpoint)
+        return LinkedInResponse(200, b'{"user": {"first_name": "Ada"}}')
+
+    monkeypatch.setattr(person_post.linkedin_client, "get", get)
+    user_name = f"ada-{uuid.uuid4().hex}"
+
+    async def scenario():
+        return [await person_post.get_all_posts(user_name) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [(None, None), (None, None)]
+    assert calls == ["user"]
+
+
+@pytest.mark.parametrize("result, cached", [
+    ({"success": True, "data": {"profile_link": "https://linkedin.com/in/ada"}, "status_code": 200}, True),
+    ({"success": True, "data": {"name": "Ada"}, "status_code": 200}, True),
+    ({"success": False, "error": "HTTP 404: Not Found", "status_code": 404}, True),
+    ({"success": False, "error": "Request timed out after 120s"}, False),
+])
+def test_person_details_outcomes(monkeypatch, result, cached):
+    calls = []
+
+    async def fetch(user_name, basic_details, timeout):
+        calls.append(user_name)
+        return result
+
+    monkeypatch.setattr(person_details, "_fetch_person_details", fetch)
+    user_name = f"Ada {uuid.uuid4().hex}"
+
+    async def scenario():
+        return [await person_details.fetch_person_details(user_name, "company=Acme") for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [result, result]
+    assert len(calls) == (1 if cached else 2)
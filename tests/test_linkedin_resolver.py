@@ -0,0 +1,127 @@
+import asyncio
+import gc
+import time
+import uuid
+
+import pytest
+
+import api.linkedin_resolver as resolver
+from api import person_details
+from api.entity_cache import entity_key, profile_cache
+from api.linkedin_resolver import linkedin_username_from_results, resolve_linkedin_username
+
+SATYA = {
+    "url": "https://www.linkedin.com/in/satyanadella",
+    "title": "Satya Nadella - Chairman and CEO - Microsoft | LinkedIn",
+    "content": "Chairman and CEO at Microsoft.",
+}
+NEWS = {"url": "https://news.example.com/satya", "title": "Satya Nadella on AI", "content": "Microsoft CEO"}
+
+
+@pytest.mark.parametrize("results, name, attributes, expected", [
+    ([NEWS, SATYA], "Satya Nadella", {"company": "Microsoft"}, "satyanadella"),
+    ([SATYA], "Satya Nadella", {}, "satyanadella"),
+    # attribute not mentioned
+    ([SATYA], "Satya Nadella", {"company": "Google"}, None),
+    # name not in title or slug
+    ([SATYA], "Sundar Pichai", {"company": "Microsoft"}, None),
+    # no profile URL among the results
+    ([NEWS], "Satya Nadella", {"company": "Microsoft"}, None),
+    # two different profiles match: ambiguous
+    ([SATYA, {**SATYA, "url": "https://in.linkedin.com/in/satya-nadella-42"}], "Satya Nadella", {}, None),
+    # accents folded, name found in the slug
+    ([{"url": "https://es.linkedin.com/in/jose-garcia-acme/", "title": "Acme | LinkedIn", "content": "Works at Acme"}],
+     "José García", {"company": "Acme"}, "jose-garcia-acme"),
+])
+def test_username_from_results(results, name, attributes, expected):
+    assert linkedin_username_from_results(results, name, attributes) == expected
+
+
+def details_after(seconds: float, profile_link: str = "https://www.linkedin.com/in/from-details/", success: bool = True):
+    async def fetch_person_details(user_name, basic_details, allow_stale=False):
+        await asyncio.sleep(seconds)
+        if not success:
+            return {"success": False, "error": "HTTP 404", "status_code": 404}
+        return {"success": True, "data": {"profile_link": profile_link}, "status_code": 200}
+    return fetch_person_details
+
+
+async def results_after(seconds: float, results: list) -> list:
+    await asyncio.sleep(seconds)
+    return results
+
+
+def resolve(monkeypatch, details, web_results, attributes=None) -> tuple[str, float]:
+    monkeypatch.setattr(resolver, "fetch_person_details", details)
+
+    async def scenario():
+        started = time.perf_counter()
+        username = await resolve_linkedin_username("Satya Nadella", "company=Microsoft", attributes or {"company": "Microsoft"}, web_results)
+        return username, time.perf_counter() - started
+
+    return asyncio.run(scenario())
+
+
+def test_confident_web_result_wins_the_race(monkeypatch):
+    username, elapsed = resolve(monkeypatch, details_after(1.0), results_after(0.05, [SATYA]))
+    assert username == "satyanadella"
+    assert elapsed < 0.5
+
+
+def test_person_details_wins_when_first(monkeypatch):
+    username, elapsed = resolve(monkeypatch, details_after(0.01), results_after(1.0, [SATYA]))
+    assert username == "from-details"
+    assert elapsed < 0.5
+
+
+def test_unconfident_web_results_wait_for_person_details(monkeypatch):
+    username, elapsed = resolve(monkeypatch, details_after(0.2), results_after(0.01, [NEWS]))
+    assert username == "from-details"
+    assert elapsed >= 0.2
+
+
+def test_failed_person_details_falls_back_to_web_results(monkeypatch):
+    username, _ = resolve(monkeypatch, details_after(0.01, success=False), results_after(0.1, [SATYA]))
+    assert username == "satyanadella"
+
+
+def test_failed_web_search_waits_for_person_details(monkeypatch):
+    async def broken():
+        raise RuntimeError("search down")
+
+    username, _ = resolve(monkeypatch, details_after(0.05), broken())
+    assert username == "from-details"
+
+
+def test_nothing_resolved(monkeypatch):
+    username, _ = resolve(monkeypatch, details_after(0.01, success=False), results_after(0.01, [NEWS]))
+    assert username == ""
+
+
+def test_without_web_results(monkeypatch):
+    username, _ = resolve(monkeypatch, details_after(0.01), None)
+    assert username == "from-details"
+
+
+def test_losing_person_details_call_still_fills_the_cache(monkeypatch):
+    basic_details = f"company=Microsoft | id={uuid.uuid4().hex}"
+
+    async def fetch(user_name, basic_details, timeout):
+        await asyncio.sleep(0.1)
+        return {"success": True, "data": {"profile_link": "https://www.linkedin.com/in/from-details/"}, "status_code": 200}
+
+    monkeypatch.setattr(person_details, "_fetch_person_details", fetch)
+
+    async def scenario():
+        username = await resolve_linkedin_username("Satya Nadella", basic_details, {}, results_after(0.01, [SATYA]))
+        kept = len(resolver._background_lookups)
+        gc.collect()
+        await asyncio.sleep(0.2)
+        cached = await profile_cache.get(entity_key("person", "Satya Nadella", basic_details))
+        return username, kept, cached
+
+    username, kept, cached = asyncio.run(scenario())
+    assert username == "satyanadella"
+    assert kept == 1
+    assert cached is not None
+    assert not resolver._background_lookups
@@ -0,0 +1,64 @@
+import asyncio
+import uuid
+
+import pytest
+
+import main
+from helper.run_budget import current_run_budget
+from processes.dag import StageGraph, StageNode
+from processes.result_cache import get_cached_result
+
+
+def budget_graph() -> StageGraph:
+    """shallow → deep, where deep is skipped whenever the run has a budget."""
+    async def shallow(inputs):
+        return {"shallow_notes": [f"shallow note on {inputs['query']}"]}
+
+    async def deep(inputs):
+        return {"deep_notes": ["deep note"]}
+
+    return StageGraph([
+        StageNode("shallow", shallow, ["query"], ["shallow_notes"],
+                  event="shallow", event_data=lambda outputs: outputs["shallow_notes"]),
+        StageNode("deep", deep, ["shallow_notes"], ["deep_notes"],
+                  event="deep", event_data=lambda outputs: outputs["deep_notes"],
+                  skip_if=lambda inputs: "budget spent" if current_run_budget.get() else None),
+    ], initial_inputs=("query", "research_options"))
+
+
+@pytest.fixture(autouse=True)
+def toy_graph(monkeypatch):
+    monkeypatch.setattr(main, "get_research_graph", lambda research_type, options: budget_graph())
+
+
+async def run(query=None, run_id=None, options=None) -> dict:
+    events = [event async for event in main.research_events("Shallow", query=query, run_id=run_id, options=options)]
+    return {"run_id": events[0]["data"]["run_id"], "notes": events[-1]["data"]}
+
+
+def test_budget_skipped_stage_runs_on_resume_without_budget():
+    async def scenario():
+        query = f"budget skip {uuid.uuid4().hex}"
+        first = await run(query=query, options={"max_llm_tokens": 1000})
+        assert first["notes"] == [f"shallow note on {query}"]
+        # cut short by the budget: not the full answer
+        assert await get_cached_result("Shallow", query) is None
+
+        resumed = await run(run_id=first["run_id"], options={})
+        assert resumed["notes"] == [f"shallow note on {query}", "deep note"]
+        cached = await get_cached_result("Shallow", query)
+        assert cached is not None and cached["run_id"] == first["run_id"]
+
+    asyncio.run(scenario())
+
+
+def test_skips_are_reevaluated_with_the_stored_budget():
+    async def scenario():
+        query = f"budget skip again {uuid.uuid4().hex}"
+        first = await run(query=query, options={"max_llm_tokens": 1000})
+        # options=None resumes with the checkpointed options, budget included
+        again = await run(run_id=first["run_id"])
+        assert again["notes"] == [f"shallow note on {query}"]
+        assert await get_cached_result("Shallow", query) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import processes.search_round as search_round
+from tools.search_records import SearchRecord
+
+
+def record(url: str, score: float = 0.95) -> SearchRecord:
+    return SearchRecord(url=url, title="", score=score, content=f"content of {url}")
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Stubs the batched search: every query gets one result named after it; 'broken' queries fail."""
+    searched = []
+
+    async def search_many(queries, profile, concurrency):
+        searched.append(list(queries))
+        return [
+            {"error": "boom"} if "broken" in query else {"query": query, "results": [record(f"https://example.com/{query}")]}
+            for query in queries
+        ]
+
+    async def filter_results(data, keyword):
+        return [result.to_dict() for result in data["results"]]
+
+    monkeypatch.setattr(search_round, "tavily_web_search_many", search_many)
+    monkeypatch.setattr(search_round, "filter_results", filter_results)
+    return searched
+
+
+def query(name: str, text: str) -> dict:
+    return {"name": name, "type": "company", "primary_identifier": "", "query": text}
+
+
+def test_failed_queries_are_skipped(searches):
+    research = {"used_queries": []}
+    queries = [query("Acme", "revenue"), query("Acme", "broken search"), query("Acme", "leadership")]
+
+    data = asyncio.run(search_round.search_round_function(queries, research))
+
+    assert [item["url"] for item in data] == [
+        "https://example.com/company ('Acme' '') revenue",
+        "https://example.com/company ('Acme' '') leadership",
+    ]
+    assert research["used_queries"] == [queries[0], queries[2]]
+
+
+def test_query_that_cannot_be_built_is_skipped(searches):
+    research = {"used_queries": []}
+    queries = [{"name": "Acme"}, query("Acme", "revenue")]
+
+    data = asyncio.run(search_round.search_round_function(queries, research))
+
+    assert len(data) == 1
+    assert searches == [["company ('Acme' '') revenue"]]
+    assert research["used_queries"] == [queries[1]]
+
+
+def test_repeated_search_keeps_results_once(searches):
+    research = {"used_queries": []}
+    queries = [query("Acme", "revenue"), query("Acme", "Revenue "), query("Acme", "leadership")]
+
+    data = asyncio.run(search_round.search_round_function(queries, research))
+
+    assert [item["url"] for item in data] == [
+        "https://example.com/company ('Acme' '') revenue",
+        "https://example.com/company ('Acme' '') leadership",
+    ]
+    assert research["used_queries"] == queries
+
+
+def test_empty_round(searches):
+    assert asyncio.run(search_round.search_round_function([], {"used_queries": []})) == []
+    assert searches == []
@@ -0,0 +1,107 @@
+import asyncio
+import re
+
+import numpy as np
+import pytest
+
+import tools.semantic_search_cache as semantic
+from tools.search_cache import search_cache, search_cache_key
+from tools.semantic_search_cache import SemanticQueryIndex
+
+PARAMS = {"search_depth": "advanced", "max_results": 20}
+# "fiscal"/"fy" carry no meaning here, so paraphrases embed identically; names are left
+# out of the vocabulary so two people embed identically too — only the guard tells them apart
+VOCAB = {"revenue": 0, "2024": 1, "fy2024": 1, "2023": 2, "about": 3, "company": 4, "infosys": 5, "interviews": 6}
+
+
+def encode(query: str) -> np.ndarray:
+    vector = np.zeros(len(VOCAB), dtype=np.float32)
+    for word in re.findall(r"\w+", query.lower()):
+        if word in VOCAB:
+            vector[VOCAB[word]] += 1
+    return vector / np.linalg.norm(vector)
+
+
+def index_with(*queries: str) -> SemanticQueryIndex:
+    index = SemanticQueryIndex(threshold=0.9, ttl=60, max_entries=8, enabled=True)
+    for query in queries:
+        index.add(encode(query), query, PARAMS, cache_key=query)
+    return index
+
+
+def test_paraphrase_of_same_entity_hits():
+    index = index_with("About ('Rahul Sharma' 'company=Infosys') revenue FY2024")
+    query = "about ( 'rahul  sharma' 'company=infosys' ) fiscal revenue 2024"
+    match = index.nearest(encode(query), query, PARAMS)
+    assert match is not None
+    assert match[1] == "About ('Rahul Sharma' 'company=Infosys') revenue FY2024"
+
+
+@pytest.mark.parametrize("query", [
+    "About ('Rohit Sharma' 'company=Infosys') revenue FY2024",
+    "About ('Rahul Sharma' 'company=TCS') revenue FY2024",
+    "person ('Rohit Sharma') interviews",
+])
+def test_different_entity_misses(query):
+    index = index_with(
+        "About ('Rahul Sharma' 'company=Infosys') revenue FY2024",
+        "person ('Rahul Sharma') interviews",
+    )
+    assert index.nearest(encode(query), query, PARAMS) is None
+
+
+def test_numbers_and_params_must_match():
+    index = index_with("company ('Infosys') revenue 2024")
+    assert index.nearest(encode("company ('Infosys') revenue 2023"), "company ('Infosys') revenue 2023", PARAMS) is None
+    query = "company ('Infosys') revenue fiscal 2024"
+    assert index.nearest(encode(query), query, {**PARAMS, "search_depth": "basic"}) is None
+    assert index.nearest(encode(query), query, PARAMS) is not None
+
+
+def test_expired_and_overwritten_rows_are_not_matched():
+    index = SemanticQueryIndex(threshold=0.9, ttl=60, max_entries=2, enabled=True)
+    first = "company ('Infosys') revenue 2024"
+    index.add(encode(first), first, PARAMS, cache_key="first")
+    row, _, _ = index.nearest(encode(first), first, PARAMS)
+    index.discard(row)
+    assert index.nearest(encode(first), first, PARAMS) is None
+
+    index.add(encode(first), first, PARAMS, cache_key="second")
+    index.add(encode("company ('Infosys') revenue 2023"), "company ('Infosys') revenue 2023", PARAMS, cache_key="third")
+    index.add(encode("company ('Infosys') interviews"), "company ('Infosys') interviews", PARAMS, cache_key="fourth")
+    # the ring holds two rows: "second" was overwritten
+    assert index.nearest(encode(first), first, PARAMS) is None
+
+
+def test_get_similar_search_returns_cached_response_of_paraphrase(monkeypatch):
+    index = SemanticQueryIndex(threshold=0.9, ttl=60, max_entries=8, enabled=True)
+    monkeypatch.setattr(index, "_encode", encode)
+    monkeypatch.setattr(semantic, "semantic_query_index", index)
+
+    async def scenario():
+        original = "About ('Rahul Sharma' 'company=Infosys') revenue FY2024"
+        key = search_cache_key(original, **PARAMS)
+        await search_cache.set(key, {"query": original, "results": []})
+        cached, embedding = await semantic.get_similar_search(original, PARAMS)
+        assert cached is None
+        semantic.remember_search(embedding, original, PARAMS, key)
+
+        hit, _ = await semantic.get_similar_search("About ('Rahul Sharma' 'company=Infosys') fiscal revenue 2024", PARAMS)
+        miss, _ = await semantic.get_similar_search("About ('Rohit Sharma' 'company=Infosys') revenue FY2024", PARAMS)
+        return hit, miss
+
+    hit, miss = asyncio.run(scenario())
+    assert hit == {"query": "About ('Rahul Sharma' 'company=Infosys') revenue FY2024", "results": []}
+    assert miss is None
+    assert (index.hits, index.misses) == (1, 2)
+
+
+def test_embedding_failure_disables_layer(monkeypatch):
+    index = SemanticQueryIndex(enabled=True)
+
+    def broken(query):
+        raise RuntimeError("no model")
+
+    monkeypatch.setattr(index, "_encode", broken)
+    assert asyncio.run(index.embed("anything")) is None
+    assert index.enabled is False
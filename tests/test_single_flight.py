@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from helper.single_flight import SingleFlight, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Satya   Nadella\tCEO ") == "satya nadella ceo"
+    assert normalize_query(None) == ""
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "report"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["report"] * 5
+    assert runs == [1]
+    assert flight.stats() == {"in_flight": 0, "started": 1, "coalesced": 4}
+
+
+def test_different_keys_and_later_calls_run_again():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        return len(runs)
+
+    async def scenario():
+        first = await asyncio.gather(flight.do("a", work), flight.do("b", work))
+        return first, await flight.do("a", work)
+
+    assert asyncio.run(scenario()) == ([1, 2], 3)
+    assert flight.coalesced == 0
+
+
+def test_error_reaches_every_caller_and_is_not_cached():
+    flight = SingleFlight()
+    attempts = []
+
+    async def fails():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        results = await asyncio.gather(flight.do("key", fails), flight.do("key", fails), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", fails)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert attempts == [1, 1]
+
+
+def test_cancelled_caller_does_not_cancel_the_run():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "report"
+
+    async def scenario():
+        leaving = asyncio.create_task(flight.do("key", work))
+        staying = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        return await staying, leaving.cancelled()
+
+    assert asyncio.run(scenario()) == ("report", True)
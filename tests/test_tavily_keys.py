@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from tools.tavily_keys import (
+    BAD_REQUEST, CLOSED, ERROR, HALF_OPEN, INVALID_KEY, OPEN, QUOTA_EXHAUSTED, RATE_LIMITED,
+    TAVILY_BREAKER_FAILURES, TAVILY_ERROR_COOLDOWN, TAVILY_RATE_LIMIT_COOLDOWN,
+    TavilyKeyScheduler, classify_tavily_error,
+)
+
+
+class Client:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class UsageLimitExceededError(Exception):
+    pass
+
+
+CLIENTS = [(0, Client("k0")), (1, Client("k1")), (2, Client("k2"))]
+
+
+def keys(ordered) -> list[int]:
+    return [key_index for key_index, _ in ordered]
+
+
+def fail(scheduler, key_index: int, error: Exception) -> str:
+    scheduler.acquire(f"k{key_index}", key_index)
+    return scheduler.record_failure(f"k{key_index}", key_index, error)
+
+
+def reopen_now(scheduler, key_index: int) -> None:
+    scheduler._keys[f"k{key_index}"].open_until = time.monotonic() - 1
+
+
+@pytest.mark.parametrize("error, kind", [
+    (HTTPError(429), RATE_LIMITED),
+    (HTTPError(432), QUOTA_EXHAUSTED),
+    (HTTPError(401), INVALID_KEY),
+    (HTTPError(400), BAD_REQUEST),
+    (HTTPError(502), ERROR),
+    (UsageLimitExceededError("slow down"), RATE_LIMITED),
+    (TimeoutError(60), ERROR),
+])
+def test_classify(error, kind):
+    assert classify_tavily_error(error) == kind
+
+
+def test_least_loaded_order():
+    scheduler = TavilyKeyScheduler(strategy="least_loaded")
+    scheduler.order(CLIENTS)
+    scheduler.acquire("k0", 0)
+    scheduler.acquire("k0", 0)
+    scheduler.acquire("k1", 1)
+    assert keys(scheduler.order(CLIENTS)) == [2, 1, 0]
+
+
+def test_round_robin_order():
+    scheduler = TavilyKeyScheduler(strategy="round_robin")
+    firsts = [keys(scheduler.order(CLIENTS))[0] for _ in range(3)]
+    assert sorted(firsts) == [0, 1, 2]
+
+
+def test_rate_limit_opens_circuit_at_once():
+    scheduler = TavilyKeyScheduler()
+    scheduler.order(CLIENTS)
+    assert fail(scheduler, 0, HTTPError(429)) == RATE_LIMITED
+    assert keys(scheduler.order(CLIENTS)) == [1, 2]
+    assert scheduler._keys["k0"].cooldown == TAVILY_RATE_LIMIT_COOLDOWN
+
+
+def test_generic_failures_open_circuit_after_threshold():
+    scheduler = TavilyKeyScheduler()
+    scheduler.order(CLIENTS)
+    for _ in range(TAVILY_BREAKER_FAILURES - 1):
+        fail(scheduler, 0, HTTPError(502))
+    assert scheduler._keys["k0"].state == CLOSED
+    fail(scheduler, 0, HTTPError(502))
+    assert scheduler._keys["k0"].state == OPEN
+    assert scheduler._keys["k0"].cooldown == TAVILY_ERROR_COOLDOWN
+
+
+def test_bad_request_does_not_count_against_key():
+    scheduler = TavilyKeyScheduler()
+    scheduler.order(CLIENTS)
+    for _ in range(TAVILY_BREAKER_FAILURES + 1):
+        assert fail(scheduler, 0, HTTPError(400)) == BAD_REQUEST
+    assert scheduler._keys["k0"].state == CLOSED
+    assert scheduler._keys["k0"].in_flight == 0
+
+
+def test_half_open_probe_success_closes_circuit():
+    scheduler = TavilyKeyScheduler()
+    scheduler.order(CLIENTS)
+    fail(scheduler, 0, HTTPError(429))
+    reopen_now(scheduler, 0)
+
+    # probes go first, and only one at a time
+    assert keys(scheduler.order(CLIENTS)) == [0, 1, 2]
+    assert scheduler._keys["k0"].state == HALF_OPEN
+    scheduler.acquire("k0", 0)
+    assert keys(scheduler.order(CLIENTS)) == [1, 2]
+
+    scheduler.record_success("k0", 0)
+    assert scheduler._keys["k0"].state == CLOSED
+    assert 0 in keys(scheduler.order(CLIENTS))
+
+
+def test_half_open_probe_failure_doubles_cooldown():
+    scheduler = TavilyKeyScheduler()
+    scheduler.order(CLIENTS)
+    fail(scheduler, 0, HTTPError(429))
+    reopen_now(scheduler, 0)
+    scheduler.order(CLIENTS)
+    fail(scheduler, 0, HTTPError(429))
+    assert scheduler._keys["k0"].state == OPEN
+    assert scheduler._keys["k0"].cooldown == 2 * TAVILY_RATE_LIMIT_COOLDOWN
+
+
+def test_cancelled_probe_can_be_retried():
+    scheduler = TavilyKeyScheduler()
+    scheduler.order(CLIENTS)
+    fail(scheduler, 0, HTTPError(429))
+    reopen_now(scheduler, 0)
+    scheduler.order(CLIENTS)
+    scheduler.acquire("k0", 0)
+    scheduler.record_cancelled("k0", 0)
+    assert keys(scheduler.order(CLIENTS))[0] == 0
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+from tools.tavily_scheduler import (
+    PRIORITY_NORMAL, PRIORITY_STEP0, TavilySearchScheduler, TokenBucket, search_owner, search_priority,
+)
+
+
+class Client:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+
+KEYS = [(0, Client("k0")), (1, Client("k1"))]
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate_per_second=10, capacity=2)
+    now = bucket.updated_at
+    assert bucket.try_take(now) and bucket.try_take(now)
+    assert not bucket.try_take(now)
+    assert abs(bucket.seconds_until_token(now) - 0.1) < 1e-6
+    assert bucket.try_take(now + 0.11)
+    # never more than the capacity, however long it was idle
+    bucket.try_take(now + 100)
+    assert bucket.tokens == 1
+
+
+def test_new_bucket_has_its_burst_for_an_earlier_clock_reading():
+    bucket = TokenBucket(rate_per_second=10, capacity=1)
+    assert bucket.try_take(bucket.updated_at - 0.5)
+
+
+def test_burst_is_granted_without_waiting_and_spread_over_keys():
+    scheduler = TavilySearchScheduler(rate_per_minute=60, burst=2)
+
+    async def scenario():
+        return [await scheduler.acquire_key(KEYS) for _ in range(4)]
+
+    granted = asyncio.run(scenario())
+    assert [key_index for key_index, _ in granted] == [0, 0, 1, 1]
+
+
+def test_search_waits_for_a_token():
+    scheduler = TavilySearchScheduler(rate_per_minute=600, burst=1)  # one token per 0.1s
+
+    async def scenario():
+        await scheduler.acquire_key(KEYS[:1])
+        started = time.monotonic()
+        await scheduler.acquire_key(KEYS[:1])
+        return time.monotonic() - started
+
+    assert 0.07 < asyncio.run(scenario()) < 0.5
+
+
+def test_priority_then_round_robin_across_runs():
+    scheduler = TavilySearchScheduler(rate_per_minute=1200, burst=1)  # one token per 0.05s
+    granted = []
+
+    async def search(owner: str, priority: int, tag: str):
+        search_owner.set(owner)
+        search_priority.set(priority)
+        await scheduler.acquire_key(KEYS[:1])
+        granted.append(tag)
+
+    async def scenario():
+        assert scheduler.try_acquire_key(KEYS[:1]) is not None  # drain the bucket
+        tasks = [
+            asyncio.create_task(search("deep-run", PRIORITY_NORMAL, "deep-1")),
+            asyncio.create_task(search("deep-run", PRIORITY_NORMAL, "deep-2")),
+            asyncio.create_task(search("deep-run", PRIORITY_NORMAL, "deep-3")),
+            asyncio.create_task(search("shallow-run", PRIORITY_NORMAL, "shallow-1")),
+            asyncio.create_task(search("new-run", PRIORITY_STEP0, "step0")),
+        ]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert granted == ["step0", "deep-1", "shallow-1", "deep-2", "deep-3"]
+
+
+def test_try_acquire_never_jumps_the_queue():
+    scheduler = TavilySearchScheduler(rate_per_minute=600, burst=1)
+
+    async def scenario():
+        await scheduler.acquire_key(KEYS[:1])
+        waiting = asyncio.create_task(scheduler.acquire_key(KEYS[:1]))
+        await asyncio.sleep(0)
+        # k1 has a token, but a search is queued
+        hedge = scheduler.try_acquire_key(KEYS[1:])
+        await waiting
+        return hedge, scheduler.try_acquire_key(KEYS[1:])
+
+    hedge, later = asyncio.run(scenario())
+    assert hedge is None
+    assert later is not None and later[0] == 1
+
+
+def test_cancelled_waiter_is_dropped():
+    scheduler = TavilySearchScheduler(rate_per_minute=600, burst=1)
+
+    async def scenario():
+        await scheduler.acquire_key(KEYS[:1])
+        cancelled = asyncio.create_task(scheduler.acquire_key(KEYS[:1]))
+        kept = asyncio.create_task(scheduler.acquire_key(KEYS[:1]))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await kept
+        return scheduler.stats()["queued"]
+
+    assert asyncio.run(scenario()) == 0
@@ -0,0 +1,174 @@
+import asyncio
+import uuid
+
+import pytest
+
+import tools.tavily as tavily
+from tools.tavily_keys import TavilyKeyScheduler
+from tools.tavily_scheduler import TavilySearchScheduler
+
+
+class Client:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class Calls(list):
+    """(api_key, query) of every search made; `behaviour[api_key]` is (delay seconds, error or None)."""
+
+    def __init__(self):
+        super().__init__()
+        self.behaviour = {}
+
+
+KEYS = ["k0", "k1", "k2"]
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Stubs the Tavily call and the process-wide key state; returns the calls made."""
+    calls = Calls()
+
+    async def search(client, query, profile):
+        calls.append((client.api_key, query))
+        delay, error = calls.behaviour.get(client.api_key, (0, None))
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return {"query": query, "results": [{"url": f"https://example.com/{client.api_key}", "title": query,
+                                             "content": client.api_key, "score": 0.95}]}, None
+
+    clients = {key: Client(key) for key in KEYS}
+    monkeypatch.setattr(tavily.tavily_client_registry, "clients_for",
+                        lambda api_keys: [(index, clients[key]) for index, key in enumerate(api_keys) if key])
+    monkeypatch.setattr(tavily, "_search", search)
+    monkeypatch.setattr(tavily, "tavily_key_scheduler", TavilyKeyScheduler(strategy="round_robin"))
+    monkeypatch.setattr(tavily, "tavily_search_scheduler", TavilySearchScheduler(rate_per_minute=6000, burst=10))
+    monkeypatch.setattr(tavily, "search_latency", tavily.SearchLatencyWindow())
+    return calls
+
+
+def key_order(monkeypatch, order):
+    """Makes the key scheduler try keys in `order`."""
+    scheduler = tavily.tavily_key_scheduler
+    monkeypatch.setattr(scheduler, "order", lambda clients: sorted(clients, key=lambda client: order.index(client[0])))
+
+
+def warm_latency(monkeypatch, seconds: float, profile: str = "advanced") -> None:
+    monkeypatch.setattr(tavily, "TAVILY_HEDGE_MIN_DELAY", 0.01)
+    for _ in range(tavily.TAVILY_HEDGE_MIN_SAMPLES):
+        tavily.search_latency.record(profile, seconds)
+
+
+def test_failed_key_falls_back_to_the_next(searches, monkeypatch):
+    key_order(monkeypatch, [0, 1, 2])
+    searches.behaviour["k0"] = (0, HTTPError(502))
+    response = asyncio.run(tavily._search_with_keys("q", KEYS, "advanced", hedge=False))
+    assert response["results"][0]["content"] == "k1"
+    assert [key for key, _ in searches] == ["k0", "k1"]
+
+
+def test_bad_request_is_not_retried_on_other_keys(searches, monkeypatch):
+    key_order(monkeypatch, [0, 1, 2])
+    searches.behaviour["k0"] = (0, HTTPError(400))
+    response = asyncio.run(tavily._search_with_keys("q", KEYS, "advanced", hedge=False))
+    assert "rejected" in response["error"]
+    assert len(searches) == 1
+
+
+def test_all_keys_failing(searches):
+    for key in KEYS:
+        searches.behaviour[key] = (0, HTTPError(502))
+    response = asyncio.run(tavily._search_with_keys("q", KEYS, "advanced", hedge=False))
+    assert response == {"error": "All Tavily clients failed to retrieve web search results."}
+    assert len(searches) == 3
+
+
+def test_no_hedge_before_enough_latency_samples(searches, monkeypatch):
+    key_order(monkeypatch, [0, 1, 2])
+    searches.behaviour["k0"] = (0.1, None)
+    response = asyncio.run(tavily._search_with_keys("q", KEYS, "advanced", hedge=True))
+    assert response["results"][0]["content"] == "k0"
+    assert len(searches) == 1
+
+
+def test_slow_search_is_hedged_and_the_loser_cancelled(searches, monkeypatch):
+    key_order(monkeypatch, [0, 1, 2])
+    warm_latency(monkeypatch, 0.02)
+    searches.behaviour["k0"] = (5, None)
+    cancelled = []
+    monkeypatch.setattr(tavily.tavily_key_scheduler, "record_cancelled",
+                        lambda api_key, key_index: cancelled.append(key_index))
+
+    async def scenario():
+        return await asyncio.wait_for(tavily._search_with_keys("q", KEYS, "advanced", hedge=True), 1)
+
+    response = asyncio.run(scenario())
+    assert response["results"][0]["content"] == "k1"
+    assert [key for key, _ in searches] == ["k0", "k1"]
+    assert cancelled == [0]
+
+
+def test_hedge_needs_a_spare_token(searches, monkeypatch):
+    key_order(monkeypatch, [0, 1, 2])
+    warm_latency(monkeypatch, 0.02)
+    searches.behaviour["k0"] = (0.1, None)
+    monkeypatch.setattr(tavily.tavily_search_scheduler, "try_acquire_key", lambda candidates: None)
+    response = asyncio.run(tavily._search_with_keys("q", KEYS, "advanced", hedge=True))
+    assert response["results"][0]["content"] == "k0"
+    assert len(searches) == 1
+
+
+def test_batch_searches_duplicates_once_in_input_order(searches):
+    prefix = uuid.uuid4().hex
+    queries = [f"{prefix} alpha", f"{prefix}  ALPHA ", f"{prefix} beta"]
+    responses = asyncio.run(tavily.tavily_web_search_many(queries, KEYS, "advanced", hedge=False))
+    assert sorted(query for _, query in searches) == [queries[0], queries[2]]
+    assert responses[0] is responses[1]
+    assert responses[2]["query"] == queries[2]
+    assert responses[0]["results"][0].title == queries[0]
+
+
+def test_batch_failure_is_an_error_entry(searches, monkeypatch):
+    async def search_function(query, tavily_api_keys, profile, hedge):
+        if query == "broken":
+            raise RuntimeError("boom")
+        return {"query": query, "results": []}
+
+    monkeypatch.setattr(tavily, "tavily_web_search_function", search_function)
+    responses = asyncio.run(tavily.tavily_web_search_many(["fine", "broken"], KEYS, "advanced"))
+    assert responses == [{"query": "fine", "results": []}, {"error": "boom"}]
+
+
+def test_batch_respects_concurrency(searches, monkeypatch):
+    running, peak = [0], [0]
+
+    async def search_function(query, tavily_api_keys, profile, hedge):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return {"query": query, "results": []}
+
+    monkeypatch.setattr(tavily, "tavily_web_search_function", search_function)
+    asyncio.run(tavily.tavily_web_search_many([f"q{i}" for i in range(10)], KEYS, "advanced", concurrency=3))
+    assert peak[0] == 3
+
+
+def test_repeated_search_is_served_from_cache(searches):
+    query = f"{uuid.uuid4().hex} cached"
+    first = asyncio.run(tavily.tavily_web_search_function(query, KEYS, "advanced", hedge=False))
+    second = asyncio.run(tavily.tavily_web_search_function(query, KEYS, "advanced", hedge=False))
+    assert len(searches) == 1
+    assert [record.url for record in second["results"]] == [record.url for record in first["results"]]
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="Unknown search profile"):
+        asyncio.run(tavily.tavily_web_search_many(["q"], KEYS, "deepest"))
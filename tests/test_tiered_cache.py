@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+from helper.tiered_cache import TieredCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_memory_and_disk_hits(db_path):
+    cache = TieredCache("results", ttl=60, max_bytes=1 << 20, db_path=db_path)
+    run(cache.set("a", {"notes": [1, 2, 3]}))
+    assert run(cache.get("a")) == {"notes": [1, 2, 3]}
+    assert (cache.memory_hits, cache.disk_hits) == (1, 0)
+
+    # a new process only has the disk tier
+    restarted = TieredCache("results", ttl=60, max_bytes=1 << 20, db_path=db_path)
+    assert run(restarted.get("a")) == {"notes": [1, 2, 3]}
+    assert run(restarted.get("a")) == {"notes": [1, 2, 3]}
+    assert (restarted.memory_hits, restarted.disk_hits) == (1, 1)
+
+
+def test_missing_and_expired_entries(db_path):
+    cache = TieredCache("results", ttl=0.05, max_bytes=1 << 20, db_path=db_path)
+    assert run(cache.get("a")) is None
+    run(cache.set("a", "value"))
+    time.sleep(0.1)
+    assert run(cache.get("a")) is None
+    assert cache.misses == 2
+
+
+def test_record_stats_false_counts_nothing(db_path):
+    cache = TieredCache("results", ttl=60, max_bytes=1 << 20, db_path=db_path)
+    run(cache.set("a", "value"))
+    assert run(cache.get("a", record_stats=False)) == "value"
+    assert run(cache.get("b", record_stats=False)) is None
+    assert (cache.memory_hits, cache.disk_hits, cache.misses) == (0, 0, 0)
+
+
+def test_memory_tier_evicts_least_recently_used_by_bytes():
+    cache = TieredCache("results", ttl=60, max_bytes=100, compress=False)
+    for key in ("a", "b", "c"):
+        run(cache.set(key, "x" * 30))  # 32 bytes each as JSON
+    run(cache.get("a"))  # "b" is now the least recently used
+    run(cache.set("d", "x" * 30))
+    assert run(cache.get("b")) is None
+    assert [run(cache.get(key)) is not None for key in ("a", "c", "d")] == [True, True, True]
+    assert cache.stats()["memory_bytes"] <= 100
+
+
+def test_oversized_value_replaces_the_memory_copy(db_path):
+    cache = TieredCache("results", ttl=60, max_bytes=100, db_path=db_path, compress=False)
+    run(cache.set("a", "small"))
+    run(cache.set("a", "x" * 500))
+    # served from disk, not the superseded small value from memory
+    assert run(cache.get("a")) == "x" * 500
+    assert cache.stats()["memory_bytes"] == 0
+
+
+def test_disk_tier_is_capped_by_bytes(db_path):
+    cache = TieredCache("results", ttl=60, max_bytes=1, db_path=db_path, disk_max_bytes=100, compress=False)
+    for key in ("a", "b", "c"):
+        run(cache.set(key, "x" * 40))
+    assert run(cache.get("a")) is None
+    assert run(cache.get("c")) == "x" * 40
+
+
+def test_stale_entries_only_served_by_get_stale(db_path):
+    cache = TieredCache("entities", ttl=0.05, max_bytes=1 << 20, db_path=db_path, stale_ttl=60)
+    run(cache.set("a", "value"))
+    assert run(cache.get_stale("a")) == ("value", True)
+    time.sleep(0.1)
+    assert run(cache.get("a")) is None
+    assert run(cache.get_stale("a")) == ("value", False)
+    assert cache.stale_hits == 1
+
+
+def test_delete_and_zero_ttl(db_path):
+    cache = TieredCache("results", ttl=60, max_bytes=1 << 20, db_path=db_path)
+    run(cache.set("a", "value"))
+    run(cache.delete("a"))
+    assert run(cache.get("a")) is None
+
+    disabled = TieredCache("disabled", ttl=0, max_bytes=1 << 20, db_path=db_path)
+    run(disabled.set("a", "value"))
+    assert run(disabled.get("a")) is None
@@ -0,0 +1,42 @@
+from dotenv import load_dotenv
+load_dotenv()
+import hashlib
+import json
+import os
+from helper.tiered_cache import TieredCache
+from helper.single_flight import normalize_query
+from helper.metrics import Gauge
+
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(3 * 24 * 3600)))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SEARCH_CACHE_DISK_MAX_BYTES = int(os.getenv("SEARCH_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+SEARCH_CACHE_DB_PATH = os.getenv("SEARCH_CACHE_DB_PATH", "search_cache.db")
+
+
+search_cache = TieredCache(
+    name="tavily_searches",
+    ttl=SEARCH_CACHE_TTL,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+    db_path=SEARCH_CACHE_DB_PATH,
+    disk_max_bytes=SEARCH_CACHE_DISK_MAX_BYTES,
+)
+
+SEARCH_CACHE_HITS = Gauge(
+    "tavily_search_cache_hits", "Searches answered from the search-result cache since start",
+    function=lambda: search_cache.memory_hits + search_cache.disk_hits,
+)
+SEARCH_CACHE_MISSES = Gauge(
+    "tavily_search_cache_misses", "Searches not found in the search-result cache since start",
+    function=lambda: search_cache.misses,
+)
+
+
+def search_cache_key(query: str, **params) -> str:
+    """
+    Content address of a search: sha256 of the normalized query plus every parameter
+    that changes the answer (search_depth, max_results, include_answer, date window).
+    The date window is passed as its length, not its dates, so the key survives midnight.
+    """
+    material = json.dumps({"query": normalize_query(query), **params}, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode()).hexdigest()
@@ -0,0 +1,82 @@
+from dotenv import load_dotenv
+load_dotenv()
+import os
+import re
+from typing import Optional
+
+
+# Max characters of content kept per search result (cut back to a sentence boundary)
+SEARCH_CONTENT_MAX_CHARS = max(1, int(os.getenv("SEARCH_CONTENT_MAX_CHARS", "1200")))
+
+_WHITESPACE = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]?\s")
+
+
+def compact_content(text: Optional[str], max_chars: int = SEARCH_CONTENT_MAX_CHARS) -> str:
+    """
+    Collapses whitespace and caps `text` at `max_chars`, cutting after the last full
+    sentence that fits. Falls back to the last word boundary (with an ellipsis) when that
+    sentence would keep less than half of the budget.
+    """
+    text = _WHITESPACE.sub(" ", text or "").strip()
+    if len(text) <= max_chars:
+        return text
+
+    window = text[:max_chars + 1]
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(window)]
+    if sentence_ends and sentence_ends[-1] >= max_chars // 2:
+        return window[:sentence_ends[-1]].rstrip()
+
+    cut = window.rfind(" ", 0, max_chars)
+    return window[:cut if cut > 0 else max_chars].rstrip() + "…"
+
+
+class SearchRecord:
+    """One search result as the pipeline uses it; everything else Tavily returns is dropped."""
+    __slots__ = ("url", "title", "score", "content")
+
+    def __init__(self, url: str, title: str, score: float, content: str):
+        self.url = url
+        self.title = title
+        self.score = score
+        self.content = content
+
+    @classmethod
+    def from_result(cls, result: dict, max_chars: int = SEARCH_CONTENT_MAX_CHARS) -> "SearchRecord":
+        return cls(
+            url=result.get("url") or "",
+            title=_WHITESPACE.sub(" ", result.get("title") or "").strip(),
+            score=float(result.get("score") or 0.0),
+            content=compact_content(result.get("content"), max_chars),
+        )
+
+    def to_dict(self) -> dict:
+        return {"url": self.url, "title": self.title, "content": self.content, "score": self.score}
+
+    def __repr__(self) -> str:
+        return f"SearchRecord(url={self.url!r}, score={self.score:.3f}, content={len(self.content)} chars)"
+
+
+def ingest_search_response(response: dict) -> dict:
+    """
+    Tavily response → {"query", "results": [SearchRecord, ...]}, done once at the
+    search boundary. Error responses are returned unchanged.
+    """
+    if "error" in response:
+        return response
+    return {
+        "query": response.get("query"),
+        "results": [SearchRecord.from_result(result) for result in response.get("results") or []],
+    }
+
+
+def search_response_to_json(response: dict) -> dict:
+    """Ingested response as plain JSON (for the search cache)."""
+    return {"query": response.get("query"), "results": [record.to_dict() for record in response["results"]]}
+
+
+def search_response_from_json(data: dict) -> dict:
+    return {
+        "query": data.get("query"),
+        "results": [SearchRecord(**result) for result in data.get("results") or []],
+    }
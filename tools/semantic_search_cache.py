@@ -0,0 +1,163 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Optional
+import numpy as np
+from helper.mpnet_keyword_extractor import _get_model
+from helper.metrics import Gauge
+from helper.single_flight import normalize_query
+from tools.search_cache import search_cache, SEARCH_CACHE_TTL
+
+
+SEMANTIC_SEARCH_CACHE = os.getenv("SEMANTIC_SEARCH_CACHE", "1") == "1"
+# Cosine similarity above which a cached search is reused for a reworded query
+SEMANTIC_SEARCH_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_SEARCH_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_SEARCH_CACHE_MAX_ENTRIES = max(1, int(os.getenv("SEMANTIC_SEARCH_CACHE_MAX_ENTRIES", "20000")))
+SEMANTIC_SEARCH_CACHE_MODEL = os.getenv("SEMANTIC_SEARCH_CACHE_MODEL", "sentence-transformers/all-mpnet-base-v2")
+
+_NUMBER = re.compile(r"\d+")
+# The quoted entity of a pipeline query: "About ('Rahul Sharma' 'company=Infosys') …",
+# "person ('Satya Nadella') …" (see helper/query_creator.py)
+_ENTITY = re.compile(r"\(\s*('.*?')\s*\)")
+
+
+class SemanticQueryIndex:
+    """
+    Nearest-neighbour index over the embeddings of searched queries, pointing at their
+    entries in the exact search cache, so "Zomato revenue fiscal 2024" can reuse the
+    results of "Zomato FY2024 revenue".
+
+    Embeddings (unit vectors from the MPNet model the extractors already load) live in a
+    preallocated ring buffer of `max_entries` rows; a lookup is one matrix-vector product
+    over it. A match must also have the same search parameters and the same numbers in the
+    query — "revenue 2023" and "revenue 2024" embed almost identically — and the same
+    quoted entity, since "About ('Rahul Sharma' …)" and "About ('Rohit Sharma' …)" do too.
+    All three are folded into one group id per row so the filter stays vectorized.
+    Only mutated from the event loop, hence no locking.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_SEARCH_CACHE_THRESHOLD,
+        ttl: float = SEARCH_CACHE_TTL,
+        max_entries: int = SEMANTIC_SEARCH_CACHE_MAX_ENTRIES,
+        model_name: str = SEMANTIC_SEARCH_CACHE_MODEL,
+        enabled: bool = SEMANTIC_SEARCH_CACHE,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.model_name = model_name
+        self.enabled = enabled
+
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim), allocated on the first add
+        self._groups = np.zeros(max_entries, dtype=np.int64)
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._cache_keys: list[Optional[str]] = [None] * max_entries
+        self._next = 0
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _group(query: str, params: dict) -> int:
+        numbers = tuple(sorted(set(_NUMBER.findall(query))))
+        entity = _ENTITY.search(query)
+        entity = normalize_query(entity.group(1)) if entity else None
+        return hash((json.dumps(params, sort_keys=True), numbers, entity))
+
+    def _encode(self, query: str) -> np.ndarray:
+        model = _get_model(self.model_name)
+        return model.encode(
+            [query], normalize_embeddings=True, show_progress_bar=False, convert_to_numpy=True
+        )[0].astype(np.float32)
+
+    async def embed(self, query: str) -> Optional[np.ndarray]:
+        """Unit embedding of `query`, or None when the layer is off or the model cannot be used."""
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._encode, query)
+        except Exception as e:
+            print(f"⚠️ Semantic search cache disabled, could not embed queries: {e}")
+            self.enabled = False
+            return None
+
+    def nearest(self, embedding: np.ndarray, query: str, params: dict) -> Optional[tuple[int, str, float]]:
+        """(row, exact cache key, similarity) of the closest live query above the threshold."""
+        if self._vectors is None or self._size == 0:
+            return None
+        size = self._size
+        live = (self._groups[:size] == self._group(query, params)) & (self._expires_at[:size] > time.time())
+        if not live.any():
+            return None
+        scores = np.where(live, self._vectors[:size] @ embedding, -np.inf)
+        row = int(np.argmax(scores))
+        if scores[row] < self.threshold:
+            return None
+        return row, self._cache_keys[row], float(scores[row])
+
+    def add(self, embedding: np.ndarray, query: str, params: dict, cache_key: str) -> None:
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+        row = self._next
+        self._vectors[row] = embedding
+        self._groups[row] = self._group(query, params)
+        self._expires_at[row] = time.time() + self.ttl
+        self._cache_keys[row] = cache_key
+        self._next = (row + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    def discard(self, row: int) -> None:
+        self._expires_at[row] = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": self._size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+semantic_query_index = SemanticQueryIndex()
+
+SEMANTIC_SEARCH_CACHE_HITS = Gauge(
+    "tavily_semantic_cache_hits", "Searches answered with the cached results of a reworded query since start",
+    function=lambda: semantic_query_index.hits,
+)
+
+
+async def get_similar_search(query: str, params: dict) -> tuple[Optional[dict], Optional[np.ndarray]]:
+    """
+    Cached response of the closest earlier search for a reworded `query`, if any, and the
+    query's embedding (None when the layer is off) to pass on to `remember_search`.
+    """
+    embedding = await semantic_query_index.embed(query)
+    if embedding is None:
+        return None, None
+
+    match = semantic_query_index.nearest(embedding, query, params)
+    if match is not None:
+        row, cache_key, similarity = match
+        cached = await search_cache.get(cache_key, record_stats=False)
+        if cached is not None:
+            semantic_query_index.hits += 1
+            print(f"♻️ Reusing cached search for {query!r} (similarity {similarity:.3f})")
+            return cached, embedding
+        # the exact entry expired or was evicted
+        semantic_query_index.discard(row)
+
+    semantic_query_index.misses += 1
+    return None, embedding
+
+
+def remember_search(embedding: Optional[np.ndarray], query: str, params: dict, cache_key: str) -> None:
+    if embedding is not None:
+        semantic_query_index.add(embedding, query, params, cache_key)
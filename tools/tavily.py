@@ -2,9 +2,25 @@ from tavily import TavilyClient
 import os
 from dotenv import load_dotenv
 import json
-import traceback
 import asyncio
-from typing import List
+import threading
+import aiohttp
+import requests
+from collections import deque
+from typing import List, Optional
+from helper.run_budget import outbound_timeout, charge_tavily_search, current_run_budget, TAVILY_CREDITS
+from helper.single_flight import normalize_query
+from helper.tracing import span
+from helper.http_sessions import http_sessions
+from helper.metrics import TAVILY_REQUESTS, TAVILY_FALLBACKS, TAVILY_DURATION, TAVILY_HEDGES
+from tools.tavily_keys import tavily_key_scheduler, BAD_REQUEST
+from tools.tavily_scheduler import tavily_search_scheduler
+from tools.search_cache import search_cache, search_cache_key
+from tools.semantic_search_cache import get_similar_search, remember_search
+from tools.search_records import (
+    SEARCH_CONTENT_MAX_CHARS, ingest_search_response, search_response_to_json, search_response_from_json,
+)
+import time
 
 load_dotenv()
 
@@ -18,45 +34,407 @@ TEST_TAVILY_KEYS = [
 from datetime import date
 from dateutil.relativedelta import relativedelta
 
+# Searches only cover this many years back from today
+SEARCH_WINDOW_YEARS = 1
+
+# Named search settings; each stage picks the cheapest one that serves it. Results are
+# filtered on score > 0.90 afterwards, so extra low-ranked results mostly get thrown away,
+# and no caller reads Tavily's generated answer.
+SEARCH_PROFILES = {
+    # entity disambiguation ("About <name> <attributes>"): a handful of top hits is enough
+    "fast": {"search_depth": "basic", "max_results": 5, "include_answer": False},
+    "basic": {"search_depth": "basic", "max_results": 10, "include_answer": False},
+    # gap-filling searches of the research rounds
+    "advanced": {"search_depth": "advanced", "max_results": 20, "include_answer": False},
+}
+# Profiles of step0's entity searches and of the research rounds' searches
+STEP0_SEARCH_PROFILE = os.getenv("STEP0_SEARCH_PROFILE", "fast")
+ROUND_SEARCH_PROFILE = os.getenv("ROUND_SEARCH_PROFILE", "advanced")
+
 end_date = date.today().isoformat()
-start_date = (date.today() - relativedelta(years=1)).isoformat()
+start_date = (date.today() - relativedelta(years=SEARCH_WINDOW_YEARS)).isoformat()
 
 
-# -------------------- Initialize clients safely --------------------
-def _initialize_clients(api_keys: List[str]):
-    clients = []
-    for key in api_keys:
-        if key:
-            try:
-                clients.append(TavilyClient(api_key=key))
-            except Exception:
-                pass
-    return clients
+# -------------------- Client registry --------------------
+# Tavily's own default request timeout
+TAVILY_TIMEOUT = 60
+# Max keep-alive connections each key's HTTP session keeps open (one per concurrent search)
+TAVILY_POOL_SIZE = max(1, int(os.getenv("TAVILY_POOL_SIZE", "10")))
+# Tavily's API endpoint; overridable for local testing and benchmarks
+TAVILY_API_BASE_URL = os.getenv("TAVILY_API_BASE_URL")
+
+
+class TavilyClientRegistry:
+    """
+    One TavilyClient per API key for the whole process, each with its own keep-alive
+    HTTP session (the key is a session header, so sessions cannot be shared across keys).
+    Built in the FastAPI lifespan and closed on shutdown; clients for keys not seen yet
+    are built lazily, so scripts running without the app work too.
+    """
+
+    def __init__(self, pool_size: int = TAVILY_POOL_SIZE, api_base_url: Optional[str] = TAVILY_API_BASE_URL):
+        self.pool_size = pool_size
+        self.api_base_url = api_base_url
+        self._clients: dict[str, TavilyClient] = {}
+        self._lock = threading.Lock()
+
+    def _build_client(self, key: str) -> TavilyClient:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return TavilyClient(api_key=key, session=session, api_base_url=self.api_base_url)
+
+    def start(self, api_keys: List[str] = TEST_TAVILY_KEYS) -> None:
+        self.clients_for(api_keys)
+        print(f"✅ Tavily client registry ready with {len(self._clients)} clients")
+
+    def clients_for(self, api_keys: List[str]) -> list[tuple[int, TavilyClient]]:
+        """(key index, client) for every configured key of `api_keys`."""
+        clients = []
+        for key_index, key in enumerate(api_keys):
+            if not key:
+                continue
+            client = self._clients.get(key)
+            if client is None:
+                with self._lock:
+                    client = self._clients.get(key)
+                    if client is None:
+                        try:
+                            client = self._clients[key] = self._build_client(key)
+                        except Exception as e:
+                            print(f"❌ Tavily client for key {key_index} could not be created: {e}")
+                            continue
+            clients.append((key_index, client))
+        return clients
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.session.close()
+
+
+tavily_client_registry = TavilyClientRegistry()
+
+
+# -------------------- Async transport --------------------
+# "aiohttp" calls the API natively on the event loop; "thread" runs TavilyClient.search
+# in the default executor (the previous behaviour, kept as a fallback)
+TAVILY_TRANSPORT = os.getenv("TAVILY_TRANSPORT", "aiohttp")
+# Connection limits of the pooled session for the Tavily host (all keys, all concurrent searches)
+TAVILY_MAX_CONNECTIONS = max(1, int(os.getenv("TAVILY_MAX_CONNECTIONS", "50")))
+TAVILY_KEEPALIVE_TIMEOUT = float(os.getenv("TAVILY_KEEPALIVE_TIMEOUT", "30"))
+# Tavily caps request timeouts at this many seconds
+TAVILY_MAX_TIMEOUT = 120
+
+
+class TavilyHTTPError(Exception):
+    """Non-200 answer of the Tavily API on the async transport."""
+
+    def __init__(self, status: int, detail: str):
+        super().__init__(f"Tavily HTTP {status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+class AsyncTavilyTransport:
+    """
+    Tavily /search over the pooled session of the Tavily host (helper/http_sessions.py),
+    shared by every key, so an in-flight search holds a socket instead of an executor
+    thread. Same request body and response dict as TavilyClient.search.
+    """
+
+    def __init__(
+        self,
+        api_base_url: Optional[str] = TAVILY_API_BASE_URL,
+        max_connections: int = TAVILY_MAX_CONNECTIONS,
+        keepalive_timeout: float = TAVILY_KEEPALIVE_TIMEOUT,
+    ):
+        self.search_url = (api_base_url or "https://api.tavily.com") + "/search"
+        http_sessions.configure(self.search_url, max_connections=max_connections, keepalive_timeout=keepalive_timeout)
+
+    async def search(self, api_key: str, timeout: Optional[float] = None, **params) -> tuple[dict, int]:
+        """(response, payload bytes) of one search."""
+        timeout = min(timeout or TAVILY_TIMEOUT, TAVILY_MAX_TIMEOUT)
+        body = {key: value for key, value in params.items() if value is not None}
+        try:
+            async with http_sessions.session(self.search_url).post(
+                self.search_url,
+                json=body,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                    "X-Client-Source": "tavily-python",
+                },
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                if response.status != 200:
+                    raise TavilyHTTPError(response.status, await response.text())
+                body = await response.read()
+                return json.loads(body), len(body)
+        except asyncio.TimeoutError:
+            raise TimeoutError(timeout)
+
+
+tavily_async_transport = AsyncTavilyTransport()
+
+
+# -------------------- Hedging --------------------
+# Send a duplicate search on another key once a search runs past the observed latency quantile
+TAVILY_HEDGE = os.getenv("TAVILY_HEDGE", "1") == "1"
+TAVILY_HEDGE_QUANTILE = float(os.getenv("TAVILY_HEDGE_QUANTILE", "0.95"))
+# Successful searches seen (per search profile) before hedging starts, and the hedge delay floor (seconds)
+TAVILY_HEDGE_MIN_SAMPLES = int(os.getenv("TAVILY_HEDGE_MIN_SAMPLES", "20"))
+TAVILY_HEDGE_MIN_DELAY = float(os.getenv("TAVILY_HEDGE_MIN_DELAY", "1.0"))
+TAVILY_LATENCY_WINDOW = int(os.getenv("TAVILY_LATENCY_WINDOW", "200"))
+# Max searches of one tavily_web_search_many call in flight at the same time
+TAVILY_BATCH_CONCURRENCY = max(1, int(os.getenv("TAVILY_BATCH_CONCURRENCY", "5")))
+
+
+class SearchLatencyWindow:
+    """Latencies of the last `window` successful searches per search profile, for the hedge delay."""
+
+    def __init__(self, window: int = TAVILY_LATENCY_WINDOW):
+        self.window = window
+        self._latencies: dict[str, deque[float]] = {}
+
+    def record(self, profile: str, seconds: float) -> None:
+        latencies = self._latencies.get(profile)
+        if latencies is None:
+            latencies = self._latencies[profile] = deque(maxlen=self.window)
+        latencies.append(seconds)
+
+    def hedge_delay(self, profile: str) -> Optional[float]:
+        """Seconds after which a search is hedged; None until enough searches were seen."""
+        latencies = self._latencies.get(profile)
+        if not latencies or len(latencies) < TAVILY_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        quantile = ordered[min(len(ordered) - 1, int(len(ordered) * TAVILY_HEDGE_QUANTILE))]
+        return max(TAVILY_HEDGE_MIN_DELAY, quantile)
+
+
+search_latency = SearchLatencyWindow()
+
+
+def _can_afford_hedge(profile: str) -> bool:
+    budget = current_run_budget.get()
+    remaining = budget.remaining_tavily_credits() if budget else None
+    # the duplicate is billed too: keep room for both
+    return remaining is None or remaining >= 2 * TAVILY_CREDITS.get(SEARCH_PROFILES[profile]["search_depth"], 1)
+
+
+def _check_profile(profile: str) -> None:
+    if profile not in SEARCH_PROFILES:
+        raise ValueError(f"Unknown search profile '{profile}', expected one of {sorted(SEARCH_PROFILES)}")
 
 
 # -------------------- Function Definition --------------------
-async def tavily_web_search_function(query: str, tavily_api_keys: List[str] = TEST_TAVILY_KEYS) -> dict:
-    clients = _initialize_clients(tavily_api_keys)
+
+
+class _AttemptFailed(Exception):
+    def __init__(self, kind: str, error: Exception):
+        super().__init__(str(error))
+        self.kind = kind
+
+
+async def _search(client: TavilyClient, query: str, profile: str) -> tuple[dict, Optional[int]]:
+    """(response, payload bytes); the thread transport does not see the payload size."""
+    params = dict(
+        query=query,
+        **SEARCH_PROFILES[profile],
+        start_date=start_date,
+        end_date=end_date,
+        timeout=outbound_timeout(TAVILY_TIMEOUT),
+    )
+    if TAVILY_TRANSPORT == "thread":
+        return await asyncio.to_thread(client.search, **params), None
+    return await tavily_async_transport.search(client.api_key, **params)
+
+
+async def tavily_web_search_function(
+    query: str,
+    tavily_api_keys: List[str] = TEST_TAVILY_KEYS,
+    profile: str = "advanced",
+    hedge: bool = TAVILY_HEDGE,
+) -> dict:
+    """
+    Tavily search behind the search-result cache (tools/search_cache.py): identical
+    searches within SEARCH_CACHE_TTL are answered from memory or disk without a call,
+    and reworded ones from the semantic index over earlier queries
+    (tools/semantic_search_cache.py).
+    `profile` names the search settings in SEARCH_PROFILES. With `hedge`, a search
+    running past the observed p95 latency is duplicated on another key and the first
+    response wins.
+    Returns {"query", "results": [SearchRecord, ...]} (tools/search_records.py), or {"error": ...}.
+    """
+    _check_profile(profile)
+    params = dict(
+        **SEARCH_PROFILES[profile],
+        date_window_years=SEARCH_WINDOW_YEARS,
+        content_max_chars=SEARCH_CONTENT_MAX_CHARS,
+    )
+    cache_key = search_cache_key(query, **params)
+    embedding = None
+    with span("tavily.cache", query=query) as cache_span:
+        cached = await search_cache.get(cache_key)
+        cache_span.set_attributes(hit=cached is not None)
+        if cached is None:
+            cached, embedding = await get_similar_search(query, params)
+            cache_span.set_attributes(semantic_hit=cached is not None)
+    if cached is not None:
+        return search_response_from_json(cached)
+
+    response = ingest_search_response(await _search_with_keys(query, tavily_api_keys, profile, hedge))
+    if "error" not in response:
+        await search_cache.set(cache_key, search_response_to_json(response))
+        remember_search(embedding, query, params, cache_key)
+    return response
+
+
+async def tavily_web_search_many(
+    queries: List[str],
+    tavily_api_keys: List[str] = TEST_TAVILY_KEYS,
+    profile: str = "advanced",
+    concurrency: int = TAVILY_BATCH_CONCURRENCY,
+    hedge: bool = TAVILY_HEDGE,
+) -> list[dict]:
+    """
+    Searches every query of `queries`, at most `concurrency` at a time, and returns the
+    responses in input order. Queries that only differ in case / whitespace are searched
+    once. A failed query gets an {"error": ...} entry instead of failing the batch.
+    """
+    _check_profile(profile)
+    unique: dict[str, str] = {}
+    for query in queries:
+        unique.setdefault(normalize_query(query), query)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def search_one(query: str) -> dict:
+        async with semaphore:
+            try:
+                return await tavily_web_search_function(query, tavily_api_keys, profile, hedge)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Tavily search failed for '{query}': {e}")
+                return {"error": str(e)}
+
+    responses = await asyncio.gather(*(search_one(query) for query in unique.values()))
+    by_query = dict(zip(unique, responses))
+    return [by_query[normalize_query(query)] for query in queries]
+
+
+async def _attempt(client: TavilyClient, key_index: int, query: str, profile: str) -> dict:
+    """One search on one key, booked with the key scheduler; raises _AttemptFailed on failure."""
+    started = time.perf_counter()
+    tavily_key_scheduler.acquire(client.api_key, key_index)
+    try:
+        with span(
+            "tavily.search",
+            client=True,
+            query=query,
+            key_index=key_index,
+            profile=profile,
+        ) as search_span:
+            response, payload_bytes = await _search(client, query, profile)
+            search_span.set_attributes(result_count=len(response.get("results", [])))
+            if payload_bytes is not None:
+                search_span.set_attributes(payload_bytes=payload_bytes)
+    except asyncio.CancelledError:
+        tavily_key_scheduler.record_cancelled(client.api_key, key_index)
+        raise
+    except Exception as e:
+        failure = tavily_key_scheduler.record_failure(client.api_key, key_index, e)
+        TAVILY_DURATION.observe(time.perf_counter() - started, key_index=key_index)
+        TAVILY_REQUESTS.inc(key_index=key_index, outcome="failure")
+        print(f"❌ Tavily key {key_index} failed ({failure}): {e}")
+        raise _AttemptFailed(failure, e)
+
+    elapsed = time.perf_counter() - started
+    tavily_key_scheduler.record_success(client.api_key, key_index)
+    TAVILY_DURATION.observe(elapsed, key_index=key_index)
+    TAVILY_REQUESTS.inc(key_index=key_index, outcome="success")
+    search_latency.record(profile, elapsed)
+    charge_tavily_search(SEARCH_PROFILES[profile]["search_depth"])
+    return response  # ✅ raw dict, not json.dumps
+
+
+async def _search_with_keys(query: str, tavily_api_keys: List[str], profile: str, hedge: bool) -> dict:
+    """
+    Searches with the key the scheduler picks (least loaded healthy key by default),
+    moving on to the next one when a key fails. Keys whose circuit breaker is open are
+    not tried at all; see tools/tavily_keys.py. Every attempt first waits for a token
+    of the key's rate limit, queued by priority and fairly across runs; see
+    tools/tavily_scheduler.py.
+
+    With `hedge`, once the attempt runs past the hedge delay a single duplicate goes out
+    on the next key — only if that key has a token to spare right now — and the first
+    successful response wins; the other attempt is cancelled.
+    """
+    clients = tavily_client_registry.clients_for(tavily_api_keys)
 
     if not clients:
         return {"error": "No valid Tavily API clients were initialized."}
-    
-    for client in clients:
-        try:
-            response = await asyncio.to_thread(
-                client.search,
-                query=query,
-                include_answer="advanced",
-                search_depth="advanced",
-                max_results=20,
-                start_date=start_date,
-                end_date=end_date,
-            )
-            return response  # ✅ raw dict, not json.dumps
-
-        except Exception as e:
-            tb = traceback.format_exc()
-            print(f"❌ Tavily client failed: {e}\n{tb}")
-            continue
-
-    return {"error": "All Tavily clients failed to retrieve web search results."}
+
+    ordered = tavily_key_scheduler.order(clients)
+    if not ordered:
+        return {"error": "All Tavily API keys are cooling down after rate limit / quota errors."}
+
+    remaining = list(ordered)
+    attempts: dict[asyncio.Task, int] = {}  # in-flight attempt -> key index
+    hedge_task: Optional[asyncio.Task] = None
+    try:
+        while attempts or remaining:
+            if not attempts:
+                key_index, client = await tavily_search_scheduler.acquire_key(remaining)
+                remaining.remove((key_index, client))
+                attempts[asyncio.create_task(_attempt(client, key_index, query, profile))] = key_index
+
+            hedge_delay = None
+            if hedge and hedge_task is None and remaining and _can_afford_hedge(profile):
+                hedge_delay = search_latency.hedge_delay(profile)
+            done, _ = await asyncio.wait(set(attempts), timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                granted = tavily_search_scheduler.try_acquire_key(remaining)
+                if granted is None:
+                    hedge = False  # no spare capacity: just wait for the attempt
+                    continue
+                remaining.remove(granted)
+                key_index, client = granted
+                hedge_task = asyncio.create_task(_attempt(client, key_index, query, profile))
+                attempts[hedge_task] = key_index
+                print(f"⏱️ Hedging slow Tavily search on key {key_index} after {hedge_delay:.1f}s")
+                continue
+
+            for task in done:
+                key_index = attempts.pop(task)
+                try:
+                    response = task.result()
+                except _AttemptFailed as e:
+                    if e.kind == BAD_REQUEST:
+                        # every key would reject the same request
+                        return {"error": f"Tavily rejected the search request: {e}"}
+                    if remaining or attempts:
+                        TAVILY_FALLBACKS.inc(key_index=key_index)
+                    continue
+
+                if hedge_task is not None:
+                    TAVILY_HEDGES.inc(winner="hedge" if task is hedge_task else "primary")
+                    if attempts:
+                        # the losing duplicate reached Tavily as well
+                        charge_tavily_search(SEARCH_PROFILES[profile]["search_depth"])
+                return response
+
+        if hedge_task is not None:
+            TAVILY_HEDGES.inc(winner="none")
+        return {"error": "All Tavily clients failed to retrieve web search results."}
+
+    finally:
+        for task in attempts:
+            task.cancel()
+        if attempts:
+            await asyncio.gather(*attempts, return_exceptions=True)
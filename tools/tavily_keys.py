@@ -0,0 +1,197 @@
+from dotenv import load_dotenv
+load_dotenv()
+import os
+import time
+from typing import Optional
+from helper.metrics import Gauge
+
+
+# "least_loaded" picks the healthy key with the fewest searches in flight (then the fewest
+# searches overall); "round_robin" rotates through the healthy keys
+TAVILY_KEY_STRATEGY = os.getenv("TAVILY_KEY_STRATEGY", "least_loaded")
+
+# Circuit breaker cooldowns (seconds) by failure kind; a failed half-open probe doubles
+# the key's cooldown, up to TAVILY_MAX_COOLDOWN
+TAVILY_RATE_LIMIT_COOLDOWN = float(os.getenv("TAVILY_RATE_LIMIT_COOLDOWN", "60"))
+TAVILY_QUOTA_COOLDOWN = float(os.getenv("TAVILY_QUOTA_COOLDOWN", "3600"))
+TAVILY_ERROR_COOLDOWN = float(os.getenv("TAVILY_ERROR_COOLDOWN", "30"))
+TAVILY_MAX_COOLDOWN = float(os.getenv("TAVILY_MAX_COOLDOWN", "86400"))
+# Consecutive generic failures (timeouts, 5xx, connection errors) that open a key's circuit
+TAVILY_BREAKER_FAILURES = max(1, int(os.getenv("TAVILY_BREAKER_FAILURES", "3")))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# failure kinds
+RATE_LIMITED = "rate_limited"
+QUOTA_EXHAUSTED = "quota_exhausted"
+INVALID_KEY = "invalid_key"
+BAD_REQUEST = "bad_request"
+ERROR = "error"
+
+_STATUS_KINDS = {
+    429: RATE_LIMITED,
+    432: QUOTA_EXHAUSTED,
+    433: QUOTA_EXHAUSTED,
+    403: QUOTA_EXHAUSTED,
+    401: INVALID_KEY,
+    400: BAD_REQUEST,
+}
+# exceptions of tavily-python's TavilyClient (thread transport) by class name
+_EXCEPTION_KINDS = {
+    "UsageLimitExceededError": RATE_LIMITED,
+    "ForbiddenError": QUOTA_EXHAUSTED,
+    "InvalidAPIKeyError": INVALID_KEY,
+    "BadRequestError": BAD_REQUEST,
+}
+# failure kinds that open the circuit on the first occurrence, and for how long
+_IMMEDIATE_COOLDOWNS = {
+    RATE_LIMITED: TAVILY_RATE_LIMIT_COOLDOWN,
+    QUOTA_EXHAUSTED: TAVILY_QUOTA_COOLDOWN,
+    INVALID_KEY: TAVILY_MAX_COOLDOWN,
+}
+
+TAVILY_KEY_CIRCUIT_OPEN = Gauge(
+    "tavily_key_circuit_open", "1 while a Tavily key's circuit breaker is open or half-open",
+    ("key_index",),
+)
+
+
+def classify_tavily_error(e: Exception) -> str:
+    status = getattr(e, "status", None)
+    if status in _STATUS_KINDS:
+        return _STATUS_KINDS[status]
+    return _EXCEPTION_KINDS.get(type(e).__name__, ERROR)
+
+
+class _KeyState:
+    def __init__(self, key_index: int):
+        self.key_index = key_index
+        self.state = CLOSED
+        self.in_flight = 0
+        self.calls = 0
+        self.consecutive_failures = 0
+        self.cooldown = 0.0
+        self.open_until = 0.0
+        self.probing = False
+        self.last_failure: Optional[str] = None
+
+
+class TavilyKeyScheduler:
+    """
+    Spreads searches across the healthy Tavily keys and keeps a circuit breaker per key.
+
+    A key's circuit opens at once on a rate limit (429), an exhausted quota (432/433/403)
+    or an invalid key (401), and after TAVILY_BREAKER_FAILURES consecutive other failures.
+    Open keys are skipped until their cooldown ends; then a single half-open probe is let
+    through — success closes the circuit, failure re-opens it with a doubled cooldown.
+    State is process-wide, so an exhausted key stays skipped across requests.
+    Only used from the event loop, hence no locking.
+    """
+
+    def __init__(self, strategy: str = TAVILY_KEY_STRATEGY):
+        self.strategy = strategy
+        self._keys: dict[str, _KeyState] = {}
+        self._rotation = 0
+
+    def _state(self, api_key: str, key_index: int) -> _KeyState:
+        state = self._keys.get(api_key)
+        if state is None:
+            state = self._keys[api_key] = _KeyState(key_index)
+        return state
+
+    def order(self, clients: list[tuple[int, object]]) -> list[tuple[int, object]]:
+        """
+        `clients` ((key index, TavilyClient) pairs) in the order they should be tried:
+        half-open probes first, then the healthy keys by strategy. Keys cooling down are left out.
+        """
+        now = time.monotonic()
+        probes, healthy = [], []
+        for key_index, client in clients:
+            state = self._state(client.api_key, key_index)
+            if state.state == CLOSED:
+                healthy.append((key_index, client))
+            elif now >= state.open_until and not state.probing:
+                state.state = HALF_OPEN
+                probes.append((key_index, client))
+
+        if self.strategy == "round_robin" and healthy:
+            self._rotation = (self._rotation + 1) % len(healthy)
+            healthy = healthy[self._rotation:] + healthy[:self._rotation]
+        else:
+            healthy.sort(key=lambda entry: (
+                self._keys[entry[1].api_key].in_flight,
+                self._keys[entry[1].api_key].calls,
+            ))
+        return probes + healthy
+
+    def acquire(self, api_key: str, key_index: int) -> None:
+        state = self._state(api_key, key_index)
+        state.in_flight += 1
+        state.calls += 1
+        if state.state == HALF_OPEN:
+            state.probing = True
+
+    def record_success(self, api_key: str, key_index: int) -> None:
+        state = self._state(api_key, key_index)
+        state.in_flight -= 1
+        state.probing = False
+        state.consecutive_failures = 0
+        state.cooldown = 0.0
+        if state.state != CLOSED:
+            print(f"✅ Tavily key {key_index} recovered, circuit closed")
+            state.state = CLOSED
+            TAVILY_KEY_CIRCUIT_OPEN.set(0, key_index=key_index)
+
+    def record_cancelled(self, api_key: str, key_index: int) -> None:
+        state = self._state(api_key, key_index)
+        state.in_flight -= 1
+        state.probing = False
+
+    def record_failure(self, api_key: str, key_index: int, e: Exception) -> str:
+        """Books a failed search against the key; returns the failure kind."""
+        state = self._state(api_key, key_index)
+        state.in_flight -= 1
+        kind = classify_tavily_error(e)
+        state.last_failure = f"{kind}: {e}"
+        if kind == BAD_REQUEST:
+            # the query's fault, not the key's
+            state.probing = False
+            return kind
+
+        state.consecutive_failures += 1
+        if state.state == HALF_OPEN:
+            cooldown = min(max(state.cooldown * 2, _IMMEDIATE_COOLDOWNS.get(kind, TAVILY_ERROR_COOLDOWN)), TAVILY_MAX_COOLDOWN)
+        elif kind in _IMMEDIATE_COOLDOWNS:
+            cooldown = _IMMEDIATE_COOLDOWNS[kind]
+        elif state.consecutive_failures >= TAVILY_BREAKER_FAILURES:
+            cooldown = TAVILY_ERROR_COOLDOWN
+        else:
+            return kind
+
+        state.state = OPEN
+        state.probing = False
+        state.cooldown = cooldown
+        state.open_until = time.monotonic() + cooldown
+        TAVILY_KEY_CIRCUIT_OPEN.set(1, key_index=key_index)
+        print(f"⚠️ Tavily key {key_index} circuit open for {cooldown:.0f}s ({kind})")
+        return kind
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "key_index": state.key_index,
+                "state": state.state,
+                "in_flight": state.in_flight,
+                "calls": state.calls,
+                "consecutive_failures": state.consecutive_failures,
+                "reopens_in_s": round(max(0.0, state.open_until - now), 1) if state.state == OPEN else None,
+                "last_failure": state.last_failure,
+            }
+            for state in sorted(self._keys.values(), key=lambda state: state.key_index)
+        ]
+
+
+tavily_key_scheduler = TavilyKeyScheduler()
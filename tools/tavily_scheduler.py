@@ -0,0 +1,182 @@
+from dotenv import load_dotenv
+load_dotenv()
+import asyncio
+import contextvars
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+from helper.metrics import Gauge, Histogram
+
+
+# Provider limits per key: requests per minute and how many may be sent back to back
+TAVILY_KEY_RATE_PER_MINUTE = float(os.getenv("TAVILY_KEY_RATE_PER_MINUTE", "100"))
+TAVILY_KEY_BURST = max(1, int(os.getenv("TAVILY_KEY_BURST", "10")))
+
+# Search priorities, lower is served first
+PRIORITY_STEP0 = 0       # step0 lookups, on the critical path to the first notes
+PRIORITY_FIRST_ROUND = 1  # searches for the shallow round's queries
+PRIORITY_NORMAL = 2
+
+# Priority of the searches made by the current task, and the research run they belong to
+# (searches are queued fairly across runs). Set by the stage / run that makes the searches.
+search_priority: contextvars.ContextVar[int] = contextvars.ContextVar("search_priority", default=PRIORITY_NORMAL)
+search_owner: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("search_owner", default=None)
+
+TAVILY_QUEUE_WAIT = Histogram(
+    "tavily_queue_wait_seconds", "Time searches waited for a rate-limit token, by priority",
+    ("priority",),
+)
+TAVILY_QUEUED = Gauge("tavily_searches_queued", "Searches waiting for a rate-limit token")
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        # `now` may predate a bucket created after the caller read the clock
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def try_take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    def __init__(self, candidates: list, priority: int, future: asyncio.Future):
+        self.candidates = candidates
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class TavilySearchScheduler:
+    """
+    Gate in front of every Tavily call: a search gets a key only when that key's token
+    bucket allows it, so concurrent runs stay under the provider's per-key rate limit
+    instead of tripping 429s.
+
+    Waiting searches are served by priority (step0 first, then the first search round,
+    then the rest) and, within a priority, round-robin across research runs — a Deep run
+    with many queued searches cannot starve a Shallow run that just started.
+    Only used from the event loop, hence no locking.
+    """
+
+    def __init__(self, rate_per_minute: float = TAVILY_KEY_RATE_PER_MINUTE, burst: int = TAVILY_KEY_BURST):
+        self.rate_per_second = rate_per_minute / 60
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        # priority -> owner -> waiters of that owner, in arrival order
+        self._queues: dict[int, "OrderedDict[Optional[str], deque[_Waiter]]"] = {}
+        self._queued = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bucket(self, api_key: str) -> TokenBucket:
+        bucket = self._buckets.get(api_key)
+        if bucket is None:
+            bucket = self._buckets[api_key] = TokenBucket(self.rate_per_second, self.burst)
+        return bucket
+
+    async def acquire_key(self, candidates: list[tuple[int, object]]) -> tuple[int, object]:
+        """
+        Waits for a token on one of `candidates` ((key index, TavilyClient) pairs, in
+        preference order) and returns the pair it was granted for.
+        """
+        priority = search_priority.get()
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(candidates, priority, future)
+        owners = self._queues.setdefault(priority, OrderedDict())
+        owners.setdefault(search_owner.get(), deque()).append(waiter)
+        self._queued += 1
+        TAVILY_QUEUED.set(self._queued)
+
+        self._dispatch()
+        try:
+            return await future
+        finally:
+            TAVILY_QUEUE_WAIT.observe(time.monotonic() - waiter.enqueued_at, priority=priority)
+
+    def try_acquire_key(self, candidates: list[tuple[int, object]]) -> Optional[tuple[int, object]]:
+        """
+        A candidate whose bucket has a token right now, without queueing; None when searches
+        are already waiting or no candidate has a token. For optional extra requests
+        (hedges), which must not take capacity from queued searches.
+        """
+        if self._queued:
+            return None
+        now = time.monotonic()
+        for candidate in candidates:
+            if self._bucket(candidate[1].api_key).try_take(now):
+                return candidate
+        return None
+
+    def _next_waiter(self) -> Optional[tuple[OrderedDict, Optional[str], _Waiter]]:
+        """Head of the highest priority queue, taking owners in round-robin order; drops cancelled waiters."""
+        for priority in sorted(self._queues):
+            owners = self._queues[priority]
+            while owners:
+                owner, waiters = next(iter(owners.items()))
+                # cancelled waiters, and waiters of an event loop that is gone
+                while waiters and (waiters[0].future.done() or waiters[0].future.get_loop().is_closed()):
+                    waiters.popleft()
+                    self._queued -= 1
+                if waiters:
+                    return owners, owner, waiters[0]
+                del owners[owner]
+        return None
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while True:
+            head = self._next_waiter()
+            if head is None:
+                break
+            owners, owner, waiter = head
+
+            granted = None
+            for candidate in waiter.candidates:
+                if self._bucket(candidate[1].api_key).try_take(now):
+                    granted = candidate
+                    break
+
+            if granted is None:
+                # no key has a token for the head waiter: try again once the first one refills
+                delay = min(self._bucket(candidate[1].api_key).seconds_until_token(now) for candidate in waiter.candidates)
+                loop = asyncio.get_running_loop()
+                if self._wakeup is None or self._wakeup_loop is not loop:
+                    self._wakeup = loop.call_later(delay, self._on_wakeup)
+                    self._wakeup_loop = loop
+                break
+
+            waiters = owners.pop(owner)
+            waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                owners[owner] = waiters  # back of the line: round-robin across owners
+            waiter.future.set_result(granted)
+
+        TAVILY_QUEUED.set(self._queued)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {"queued": self._queued, "rate_per_minute": self.rate_per_second * 60, "burst": self.burst}
+
+
+tavily_search_scheduler = TavilySearchScheduler()
@@ -1,5 +1,5 @@
 from api.person_details import fetch_person_details
-from tools.tavily import tavily_web_search_function
+from tools.tavily import tavily_web_search_function, STEP0_SEARCH_PROFILE
 from helper.pattern_match import match_pattern
 from api.company_post import get_all_company_posts
 from helper.extractor import extract_linkedin_username
@@ -22,7 +22,7 @@ async def linkedin_post_extractor(
 
     try:
 
-        user_data, user_post = await asyncio.to_thread(get_all_company_posts, name)
+        user_data, user_post = await get_all_company_posts(name, allow_stale=True)
         print("user_data in PersonColdEmail:   \n\n", user_data, "\n\n")
 
         if user_data is None:
@@ -135,8 +135,8 @@ async def web_search_function(
         try:
             query = f"About ('{name}' '{basic_details}') -inurl:hiring -inurl:jobs -inurl:careers -inurl:activity"
 
-            query_result = await tavily_web_search_function(query=query)
-            print("query_result:    ", query_result)
+            query_result = await tavily_web_search_function(query=query, profile=STEP0_SEARCH_PROFILE)
+            print(f"query_result:    {len(query_result.get('results', []))} results")
             research["used_queries"].append(query)
             results = query_result.get("results", [])
         except Exception as e:
@@ -147,9 +147,8 @@ async def web_search_function(
         filtered_query_result = []
         for single_result in results:
             try:
-                content = single_result.get("content", "")
-                if await match_pattern(content, name):
-                    filtered_query_result.append(single_result)
+                if await match_pattern(single_result.content, name):
+                    filtered_query_result.append(single_result.to_dict())
             except Exception as e:
                 print(f"❌ regex match failed for result: {str(e)}")
                 continue
@@ -9,7 +9,8 @@ async def other_workflow_function(user_intent: dict, research: dict) -> dict:
     try:
         primary_research_purpose = user_intent.get("primary_research_purpose")
         primary_research_purpose = primary_research_purpose[:400]
-        data            = await tavily_web_search_function(primary_research_purpose)
+        # the only evidence step0 gathers for non-entity targets: broader than the entity lookups
+        data            = await tavily_web_search_function(primary_research_purpose, profile="basic")
         research["used_queries"].append(primary_research_purpose)
         filtered_data   = await weak_filter_results(data=data)
         print("filtered_data other_workflow_function:   ",filtered_data)
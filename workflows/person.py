@@ -1,14 +1,14 @@
-from api.person_details import fetch_person_details
-from tools.tavily import tavily_web_search_function
+from tools.tavily import tavily_web_search_function, STEP0_SEARCH_PROFILE
 from helper.pattern_match import match_pattern
 from api.person_post import get_all_posts
-from helper.extractor import extract_linkedin_username
+from api.linkedin_resolver import resolve_linkedin_username
 from helper.mpnet_keyword_extractor import MPNetExtractor
 import asyncio
+from typing import Awaitable, Optional
 
 
 async def linkedin_post_extractor(
-    target, research: dict
+    target, research: dict, web_results: Optional[Awaitable[list[dict]]] = None
 ):
     name = target.get("name", "")
     attributes = target.get("attributes", {})
@@ -19,25 +19,17 @@ async def linkedin_post_extractor(
     )
     print("basic_details:   ", basic_details)
 
-    # Fetch LinkedIn person details
+    # Resolve the LinkedIn username: person details raced against the web results
     try:
-        linkedin_person_details = await fetch_person_details(
-            user_name=name,
-            basic_details=basic_details
-        )
+        user_id = await resolve_linkedin_username(name, basic_details, attributes, web_results)
     except Exception as e:
-        print(f"❌ fetch_person_details failed for '{name}': {str(e)}")
-        linkedin_person_details = {}
+        print(f"❌ resolve_linkedin_username failed for '{name}': {str(e)}")
+        user_id = ""
 
     try:
-        data = linkedin_person_details.get("data", {})
-        user_linkedin = data.get("profile_link", "")
-        print("user_linkedin:   ", user_linkedin)
-
-        user_id = extract_linkedin_username(user_linkedin)
         print("user_id", user_id)
 
-        user_data, user_post = await asyncio.to_thread(get_all_posts, user_id)
+        user_data, user_post = await get_all_posts(user_id, allow_stale=True)
         print("user_data in PersonColdEmail:   \n\n", user_data, "\n\n")
 
         if user_data is None:
@@ -150,8 +142,8 @@ async def web_search_function(
         try:
             query = f"About ('{name}' '{basic_details}') -inurl:hiring -inurl:jobs -inurl:careers -inurl:activity"
 
-            query_result = await tavily_web_search_function(query=query)
-            print("query_result:    ", query_result)
+            query_result = await tavily_web_search_function(query=query, profile=STEP0_SEARCH_PROFILE)
+            print(f"query_result:    {len(query_result.get('results', []))} results")
             research["used_queries"].append(query)
             results = query_result.get("results", [])
         except Exception as e:
@@ -162,9 +154,8 @@ async def web_search_function(
         filtered_query_result = []
         for single_result in results:
             try:
-                content = single_result.get("content", "")
-                if await match_pattern(content, name):
-                    filtered_query_result.append(single_result)
+                if await match_pattern(single_result.content, name):
+                    filtered_query_result.append(single_result.to_dict())
             except Exception as e:
                 print(f"❌ regex match failed for result: {str(e)}")
                 continue
@@ -184,9 +175,15 @@ async def person_workflow_function(target: dict, research: dict) -> dict:
     try:
         # FIX 4: Added missing `await` and missing comma between coroutines
         # FIX 5: Added return_exceptions=True for safe parallel execution
+        # the web search also feeds LinkedIn profile URLs to the username resolver
+        web_search = asyncio.ensure_future(web_search_function(target, research))
+
+        async def web_results() -> list[dict]:
+            return (await web_search).get("web_results_about", [])
+
         linkedin_posts, web_results_about = await asyncio.gather(
-            linkedin_post_extractor(target, research),
-            web_search_function(target, research),
+            linkedin_post_extractor(target, research, web_results()),
+            web_search,
             return_exceptions=True
         )
 